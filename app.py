@@ -1,15 +1,41 @@
 import streamlit as st
-import ingest_expert
+import config
 import match_engine
-import json
-import os
-import seed
-from sqlmodel import Session, select, SQLModel
-from models import Expert, engine
+import match_dispatcher
+import search_index
+import vector_index
+import catalog
+import match_cache
+import telemetry
+import vetting_queue
+import need_matcher
+import expert_filters
+import expert_tags
+import match_digest
+from sqlmodel import Session, SQLModel
+from models import Expert, engine, create_db_and_tables
+
+@st.cache_resource(show_spinner=False)
+def startup():
+    """ One-time process setup; Streamlit reruns the script on every interaction. """
+    # Older databases predate the search index, tag table and match digests
+    create_db_and_tables()
+    expert_tags.ensure_tags()
+    match_digest.backfill_digests()
+    # Build or catch up the BM25 and vector indexes here, not inside the first match
+    search_index.ensure_index()
+    vector_index.ensure_index()
+    # Background vetting workers and the stale-need re-matcher (once per server process)
+    vetting_queue.start_workers()
+    need_matcher.start_worker()
+
+startup()
+
+NAMES_PER_PAGE = 25
 
 # --- CLOUD FIX: API KEY CHECK ---
 api_key_present = False
-if os.environ.get("GOOGLE_API_KEY"):
+if config.api_key():
     api_key_present = True
 else:
     api_key_present = False
@@ -65,7 +91,7 @@ st.markdown("""
 with st.sidebar:
     st.header("🧬 NEXA v0")
     st.write("Expert Vetting & Matching Engine")
-    st.caption("Powered by Gemini (or Mock) & SQLModel")
+    st.caption("Powered by Gemini (or Local Ranker) & SQLModel")
     
     st.divider()
     
@@ -73,21 +99,42 @@ with st.sidebar:
     if api_key_present:
         st.success("✅ Gemini API Key Detected")
     else:
-        st.warning("⚠️ Using Mock LLM Mode")
+        st.warning("⚠️ No API Key: Using Local Matcher")
 
     st.divider()
     
     st.subheader("📊 Database Status")
     try:
-        with Session(engine) as session:
-            experts = session.exec(select(Expert)).all()
-            st.metric("Total Experts", len(experts))
-            with st.expander("Show Names"):
-                for e in experts:
-                    st.text(f"• {e.name}")
+        # Cached per catalog version: a rerun costs one version lookup, not a table scan
+        snapshot = catalog.get_snapshot()
+        st.metric("Total Experts", len(snapshot))
+        with st.expander("Show Names"):
+            name_query = st.text_input("Search names", key="name_query", label_visibility="collapsed", placeholder="Search names...")
+            pages = max(1, -(-catalog.name_count(name_query) // NAMES_PER_PAGE))
+            page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, key="name_page") if pages > 1 else 1
+            # Only one page of names is ever read or rendered
+            for name, _ in catalog.name_page(name_query, page, NAMES_PER_PAGE):
+                st.text(f"• {name}")
     except Exception as e:
         st.error(f"DB Error: {e}")
 
+    with st.expander("🏷️ Top Domains"):
+        for _, label, count in catalog.get_snapshot().tag_counts(limit=20):
+            st.text(f"• {label} ({count})")
+
+    cache_stats = match_cache.cache.stats()
+    st.caption(
+        f"⚡ Match cache ({cache_stats['backend']}): "
+        f"{cache_stats['hits']} hits / {cache_stats['misses']} misses"
+    )
+
+    with st.expander("⏱️ Latency (p50 / p95)"):
+        latency = telemetry.ring.summary()
+        if latency:
+            st.table(latency)
+        else:
+            st.caption("No matches or analyses timed yet.")
+
     st.divider()
 
     col1, col2 = st.columns(2)
@@ -96,6 +143,8 @@ with st.sidebar:
             try:
                 SQLModel.metadata.drop_all(engine)
                 SQLModel.metadata.create_all(engine)
+                catalog.bump_catalog_version()
+                import seed
                 seed.seed_data()
                 st.toast("Reseeded!", icon="♻️")
             except Exception as e:
@@ -106,6 +155,8 @@ with st.sidebar:
             try:
                 SQLModel.metadata.drop_all(engine)
                 SQLModel.metadata.create_all(engine)
+                vector_index.store.clear()
+                catalog.bump_catalog_version()
                 st.toast("Nuked! DB Empty.", icon="☢️")
             except Exception as e:
                 st.error(f"Nuke failed: {e}")
@@ -140,34 +191,55 @@ with tab1:
             if not vet_name or not vet_bio:
                 st.warning("Please provide at least a Name and Bio.")
             else:
-                with st.spinner(f"Analyzing {vet_name} with NEXA Core..."):
-                    try:
-                        # 1. Analyze
-                        # Now passing name, bio, links separately
-                        analysis = ingest_expert.analyze_profile(vet_name, vet_bio, vet_links)
-                        
-                        # 2. Save
-                        expert = ingest_expert.save_expert(analysis, vet_name, vet_bio, vet_links)
-                        
-                        st.success(f"Expert '{expert.name}' Ingested Successfully!")
-                        
-                        # Display Results
-                        st.metric("Confidence Score", f"{expert.confidence_score}/100")
-                        st.write(f"**Headline:** {expert.headline}")
-                        st.write(f"**Vetting Summary:** {expert.vetting_summary}")
-                        
-                        # Display specific skills/domains
-                        st.write("**Extracted Skills:**")
-                        st.markdown(" ".join([f"`{d}`" for d in expert.domains]))
-                        
-                        if expert.links:
-                            st.caption(f"🔗 Links: {', '.join(expert.links)}")
-                        
-                        with st.expander("View Raw Database Record"):
-                            st.json(expert.model_dump())
-                        
-                    except Exception as e:
-                        st.error(f"Error processing expert: {e}")
+                # Queue it and return immediately; background workers do the LLM call
+                job_id = vetting_queue.enqueue(vet_name, vet_bio, vet_links)
+                st.session_state.setdefault("vet_jobs", []).insert(0, job_id)
+                st.toast(f"Queued {vet_name} for vetting", icon="🧪")
+
+        def render_vetting_jobs():
+            jobs = vetting_queue.get_jobs(st.session_state.get("vet_jobs", []))
+            if not jobs:
+                st.caption("Vetting runs in the background. Submitted experts appear here.")
+                return
+            
+            st.write("#### 2. Vetting Queue")
+            status_icons = {"queued": "⏳", "running": "🔬", "done": "✅", "failed": "❌"}
+            for job in jobs:
+                with st.container(border=True):
+                    st.write(f"{status_icons.get(job.status, '•')} **{job.name}** · {job.status}")
+                    if job.status == "failed":
+                        st.error(f"Error processing expert: {job.error}")
+                    elif job.status == "queued" and job.error:
+                        st.caption(f"Retrying after error: {job.error}")
+                    if job.status != "done" or job.expert_id is None:
+                        continue
+                    
+                    with Session(engine) as session:
+                        expert = session.get(Expert, job.expert_id)
+                    if expert is None:
+                        continue
+                    
+                    # Display Results
+                    st.metric("Confidence Score", f"{expert.confidence_score}/100")
+                    st.write(f"**Headline:** {expert.headline}")
+                    st.write(f"**Vetting Summary:** {expert.vetting_summary}")
+                    
+                    # Display specific skills/domains
+                    st.write("**Extracted Skills:**")
+                    st.markdown(" ".join([f"`{d}`" for d in expert.domains]))
+                    
+                    if expert.links:
+                        st.caption(f"🔗 Links: {', '.join(expert.links)}")
+                    
+                    with st.expander("View Raw Database Record"):
+                        st.json(expert.model_dump())
+
+        # Poll job status without blocking the rest of the page
+        if hasattr(st, "fragment"):
+            st.fragment(run_every=2)(render_vetting_jobs)()
+        else:
+            render_vetting_jobs()
+            st.button("🔄 Refresh status")
 
 # --- TAB 2: SME MATCHING ---
 with tab2:
@@ -184,23 +256,70 @@ with tab2:
         st.write("") 
         match_btn = st.button("Find Match", type="primary", use_container_width=True)
     
-    st.divider()
+    match_mode = st.radio(
+        "Match mode",
+        match_engine.MATCH_MODES,
+        index=match_engine.MATCH_MODES.index(match_engine.MATCH_MODE),
+        horizontal=True,
+        help="hybrid: Gemini with local fallback · llm: Gemini only · local: offline ranker",
+    )
+    stream_results = st.toggle(
+        "Stream results",
+        value=True,
+        help="On: show each match as soon as Gemini writes it · Off: batch with other sessions' queries. "
+             "Identical queries in flight share one call either way.",
+    )
     
+    with st.expander("Filters"):
+        fcols = st.columns(4)
+        budget_band = fcols[0].text_input("Budget band", placeholder="e.g. $80-150/hr")
+        min_confidence = fcols[1].slider("Min confidence", 0, 100, 0)
+        icp = fcols[2].text_input("ICP contains", placeholder="e.g. SaaS")
+        lean = fcols[3].selectbox("Leaning", ["Any", "Strategy", "Execution"])
+        tag_options = {tag: label for tag, label, _ in catalog.get_snapshot().tag_counts(limit=200)}
+        tags = st.multiselect("Must list domains", list(tag_options), format_func=tag_options.get)
+    match_filters = {
+        **expert_filters.parse_budget_band(budget_band),
+        "min_confidence": min_confidence or None,
+        "icp": icp,
+        "min_strategy": 0.5 if lean == "Strategy" else None,
+        "min_execution": 0.5 if lean == "Execution" else None,
+        "tags": tags,
+    }
+
+    st.divider()
+
+    def render_match(m):
+        with st.container(border=True):
+            c1, c2 = st.columns([3, 1])
+            with c1:
+                st.write(f"**{m['expert_name']}**")
+                st.info(f"💡 **Why:** {m['reason']}")
+            with c2:
+                st.metric("Match Score", f"{m['score']}/100")
+
     if match_btn and sme_query:
-        with st.spinner("NEXA 'Smart Match' running..."):
-            # Now returns list of dicts: {expert_name, score, reason}
-            matches = match_engine.find_best_matches(sme_query)
-        
-        if not matches:
-            st.info("No suitable matches found.")
+        if stream_results:
+            # Cards appear one by one while the model is still writing
+            header = st.empty()
+            header.caption("NEXA 'Smart Match' running...")
+            matches = []
+            for m in match_dispatcher.stream_best_matches(sme_query, mode=match_mode, filters=match_filters):
+                matches.append(m)
+                header.write(f"Found {len(matches)} Ranked Matches:")
+                render_match(m)
+            if not matches:
+                header.info("No suitable matches found.")
         else:
-            st.write(f"Found {len(matches)} AI-Ranked Matches:")
-            
-            for m in matches:
-                with st.container(border=True):
-                    c1, c2 = st.columns([3, 1])
-                    with c1:
-                        st.write(f"**{m['expert_name']}**")
-                        st.info(f"💡 **Why:** {m['reason']}")
-                    with c2:
-                        st.metric("Match Score", f"{m['score']}/100")
+            with st.spinner("NEXA 'Smart Match' running..."):
+                # Now returns list of dicts: {expert_name, score, reason}
+                # Shared across sessions: identical queries coalesce, distinct ones share LLM calls
+                matches = match_dispatcher.find_best_matches(sme_query, mode=match_mode, filters=match_filters)
+
+            if not matches:
+                st.info("No suitable matches found.")
+            else:
+                st.write(f"Found {len(matches)} Ranked Matches:")
+
+                for m in matches:
+                    render_match(m)
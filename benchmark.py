@@ -0,0 +1,233 @@
+"""
+Offline performance benchmark (no network, no API key).
+
+    python benchmark.py                        # 1k and 10k catalogs
+    python benchmark.py --sizes 1000,10000,100000 --stub-latency 0.4 --out bench.json
+
+Each catalog size runs in a fresh subprocess against a scratch database
+(NEXA_DB_PATH) with the stub LLM (NEXA_LLM=stub), and reports:
+  - find_best_matches latency percentiles per mode, plus prompt size
+  - save_expert (single row) and save_experts (bulk) throughput
+  - bulk_ingest pipeline throughput
+and, once per run, cold-start (import) time of the app modules: in total,
+per module, and which heavy dependencies importing them pulled in.
+Results are written as JSON so runs can be diffed for regressions.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+QUERY_TEMPLATES = [
+    "I need help with {d} for my {icp}",
+    "Our {d} is a mess, who can fix it?",
+    "Looking for a {d} expert, budget is tight",
+    "{d} and {d2} strategy for {icp}",
+    "my funnel leaks and churn is high",
+]
+
+# Modules loaded when the Streamlit app starts (app.py itself needs a Streamlit runtime)
+COLD_START_MODULES = ["config", "models", "match_engine", "match_dispatcher", "vetting_queue", "need_matcher"]
+# Loaded on first use only; importing the modules above must not pull these in
+LAZY_MODULES = ["google.generativeai"]
+
+_IMPORT_PROBE = (
+    "import sys, time, json\n"
+    "t0 = time.perf_counter()\n"
+    "import {modules}\n"
+    "print(json.dumps([time.perf_counter() - t0, [m for m in {lazy!r} if m in sys.modules]]))\n"
+)
+
+
+def _pcts(values):
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda p: ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+    return {
+        "n": len(values),
+        "mean": round(statistics.mean(values), 2),
+        "p50": round(pick(50), 2),
+        "p95": round(pick(95), 2),
+        "p99": round(pick(99), 2),
+        "max": round(ordered[-1], 2),
+    }
+
+
+def make_queries(n: int, seed: int = 7):
+    import seed as seed_mod
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n):
+        a = rng.choice(seed_mod.ARCHETYPES)
+        d, d2 = rng.sample(a["domains"], 2)
+        queries.append(rng.choice(QUERY_TEMPLATES).format(d=d, d2=d2, icp=rng.choice(a["icps"])))
+    return queries
+
+
+# --- MEASUREMENTS (run inside the worker process) ---
+def bench_catalog(size: int, queries: int, ingest_records: int):
+    import models
+    import seed
+    import ingest_expert
+    import match_engine
+    import bulk_ingest
+    import telemetry
+
+    out = {"size": size}
+    models.create_db_and_tables()
+
+    t0 = time.perf_counter()
+    seed.seed_synthetic(size)
+    elapsed = time.perf_counter() - t0
+    out["save_experts_bulk"] = {"rows": size, "seconds": round(elapsed, 2), "rows_per_s": round(size / elapsed, 1)}
+
+    singles = list(seed.generate_experts(200, seed=size + 1))
+    t0 = time.perf_counter()
+    for row in singles:
+        ingest_expert.save_expert(row, "single " + row["name"], row["bio"], [])
+    elapsed = time.perf_counter() - t0
+    out["save_expert_single"] = {"rows": len(singles), "seconds": round(elapsed, 2), "rows_per_s": round(len(singles) / elapsed, 1)}
+
+    path = os.path.join(os.path.dirname(models.sqlite_file_name), "ingest.jsonl")
+    with open(path, "w") as f:
+        for row in seed.generate_experts(ingest_records, seed=size + 2):
+            f.write(json.dumps({"name": "bulk " + row["name"], "bio": row["bio"]}) + "\n")
+    stats = bulk_ingest.ingest_file(path, concurrency=8, rate=1000, chunk_size=200, log=lambda *_: None)
+    out["bulk_ingest"] = {**stats, "records_per_s": round(stats["ingested"] / max(stats["seconds"], 1e-9), 1)}
+
+    query_set = make_queries(queries)
+    out["find_best_matches"] = {}
+    for mode in ("local", "llm"):
+        # Warm-up builds lazy structures (ranker, indexes) outside the timed loop
+        t0 = time.perf_counter()
+        match_engine.find_best_matches(query_set[0], mode=mode, use_cache=False)
+        warmup = (time.perf_counter() - t0) * 1000
+
+        telemetry.ring.clear()
+        latencies = []
+        for q in query_set:
+            t0 = time.perf_counter()
+            match_engine.find_best_matches(q, mode=mode, use_cache=False)
+            latencies.append((time.perf_counter() - t0) * 1000)
+        events = telemetry.ring.events("find_best_matches")
+        out["find_best_matches"][mode] = {
+            "warmup_ms": round(warmup, 2),
+            "latency_ms": _pcts(latencies),
+            "prompt_tokens": _pcts([e["prompt_tokens"] for e in events if "prompt_tokens" in e]),
+            "prompt_chars": _pcts([e["prompt_chars"] for e in events if "prompt_chars" in e]),
+            "stages_p50_ms": {r["stage"]: r["p50_ms"] for r in telemetry.ring.summary() if r["op"] == "find_best_matches"},
+        }
+    return out
+
+
+def _import_probe(modules, env):
+    """ (seconds, lazy modules loaded) for importing modules in a fresh interpreter. """
+    code = _IMPORT_PROBE.format(modules=", ".join(modules), lazy=LAZY_MODULES)
+    proc = subprocess.run([sys.executable, "-c", code], check=True, cwd=HERE, env=env,
+                          capture_output=True, text=True)
+    seconds, loaded = json.loads(proc.stdout.strip().splitlines()[-1])
+    return seconds, loaded
+
+
+def bench_cold_start(repeats: int = 5):
+    """
+    Wall-clock of a fresh interpreter importing the app modules, the in-process
+    import time of each module on its own (a module's time includes whatever it
+    imports), and any LAZY_MODULES that got imported eagerly.
+    """
+    env = dict(os.environ, NEXA_DB_PATH=os.path.join(tempfile.mkdtemp(prefix="nexa_cold_"), "nexa.db"))
+    code = "import " + ", ".join(COLD_START_MODULES)
+    baseline, timings = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True, cwd=HERE, env=env)
+        baseline.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=HERE, env=env,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - t0)
+
+    per_module, eager = {}, set()
+    for module in COLD_START_MODULES:
+        samples = []
+        for _ in range(repeats):
+            seconds, loaded = _import_probe([module], env)
+            samples.append(seconds)
+            eager.update(loaded)
+        per_module[module] = round(statistics.median(samples), 3)
+    return {
+        "modules": COLD_START_MODULES,
+        "interpreter_s": round(statistics.median(baseline), 3),
+        "import_s": round(statistics.median(timings) - statistics.median(baseline), 3),
+        "per_module_s": per_module,
+        "eager_heavy_imports": sorted(eager),
+    }
+
+
+# --- DRIVER ---
+def run_worker(size: int, args) -> dict:
+    workdir = tempfile.mkdtemp(prefix=f"nexa_bench_{size}_")
+    env = dict(
+        os.environ,
+        NEXA_DB_PATH=os.path.join(workdir, "nexa.db"),
+        NEXA_LLM="stub",
+        NEXA_STUB_LATENCY=str(args.stub_latency),
+        NEXA_STUB_FAILURE_RATE=str(args.stub_failure_rate),
+        NEXA_MATCH_CACHE="off",
+    )
+    cmd = [sys.executable, __file__, "--worker", str(size), "--queries", str(args.queries),
+           "--ingest-records", str(args.ingest_records)]
+    proc = subprocess.run(cmd, cwd=HERE, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return {"size": size, "error": proc.stderr[-2000:]}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline NEXA benchmark")
+    parser.add_argument("--sizes", default="1000,10000", help="comma separated catalog sizes")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--ingest-records", type=int, default=500)
+    parser.add_argument("--stub-latency", type=float, default=0.0, help="seconds per stub LLM call")
+    parser.add_argument("--stub-failure-rate", type=float, default=0.0)
+    parser.add_argument("--out", default="bench_results.json")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        result = bench_catalog(args.worker, args.queries, args.ingest_records)
+        print(json.dumps(result))
+        return
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "stub_latency_s": args.stub_latency,
+            "stub_failure_rate": args.stub_failure_rate,
+            "queries": args.queries,
+        },
+        "cold_start": bench_cold_start(),
+        "catalogs": [],
+    }
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        print(f"Benchmarking {size} experts...", file=sys.stderr)
+        results["catalogs"].append(run_worker(size, args))
+
+    with open(args.out, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
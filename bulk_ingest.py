@@ -0,0 +1,196 @@
+"""
+Bulk expert ingestion from CSV or JSONL.
+
+    python bulk_ingest.py experts.csv --concurrency 8 --rate 5
+    python bulk_ingest.py experts.jsonl --stub          # offline, no API key
+
+Records need a name and a bio ("bio", "bio_text" or "mini_case_response");
+"links" may be a list or a comma separated string.
+
+Progress is journaled to <input>.ingest.log after every committed chunk, so a
+crashed run picks up where it stopped when started again with the same file.
+Records that still fail after all retries go to <input>.ingest.errors.jsonl and
+are retried on the next run.
+"""
+import os
+import csv
+import json
+import time
+import random
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import llm_client
+import ingest_expert
+from models import create_db_and_tables
+
+
+# --- RATE LIMITING ---
+class TokenBucket:
+    """ Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`. """
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait_for = (1 - self._tokens) / self.rate
+            time.sleep(wait_for)
+
+
+def call_with_retries(fn, retries: int = 4, base_delay: float = 1.0, max_delay: float = 30.0, limiter: TokenBucket = None):
+    """ Calls fn() with exponential backoff + jitter. Every attempt takes a rate-limit token. """
+    for attempt in range(retries + 1):
+        if limiter:
+            limiter.acquire()
+        try:
+            return fn()
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = min(max_delay, base_delay * 2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.0))
+
+
+# --- INPUT ---
+def _normalize_record(raw: dict):
+    name = (raw.get("name") or "").strip()
+    bio = raw.get("bio") or raw.get("bio_text") or raw.get("mini_case_response") or ""
+    links = raw.get("links") or []
+    if isinstance(links, str):
+        links = [l.strip() for l in links.split(",") if l.strip()]
+    return {"name": name, "bio": bio.strip(), "links": links}
+
+
+def iter_records(path: str):
+    """ Streams (record_no, record) pairs from a .csv or .jsonl file. """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            for record_no, row in enumerate(csv.DictReader(f)):
+                yield record_no, _normalize_record(row)
+        else:
+            for record_no, line in enumerate(f):
+                if line.strip():
+                    yield record_no, _normalize_record(json.loads(line))
+
+
+# --- CHECKPOINTS ---
+class Journal:
+    """ Append-only list of committed record numbers (one per line). """
+    def __init__(self, path: str):
+        self.path = path
+        self.done = set()
+        if os.path.exists(path):
+            with open(path) as f:
+                self.done = {int(line) for line in f if line.strip()}
+
+    def mark(self, record_nos):
+        with open(self.path, "a") as f:
+            f.writelines(f"{n}\n" for n in record_nos)
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(record_nos)
+
+
+# --- PIPELINE ---
+def ingest_file(path: str, concurrency: int = 8, rate: float = 5.0, chunk_size: int = 100, retries: int = 4, log=print):
+    """ Runs the whole import. Returns a summary dict. """
+    create_db_and_tables()
+    journal = Journal(path + ".ingest.log")
+    errors_path = path + ".ingest.errors.jsonl"
+    limiter = TokenBucket(rate, capacity=concurrency)
+    stats = {"ingested": 0, "skipped": 0, "failed": 0, "invalid": 0}
+    started = time.monotonic()
+
+    buffer = []   # (record_no, analysis, record) waiting for the next bulk commit
+
+    def flush():
+        if not buffer:
+            return
+        ingest_expert.save_experts([(a, r["name"], r["bio"], r["links"]) for _, a, r in buffer])
+        journal.mark([n for n, _, _ in buffer])
+        stats["ingested"] += len(buffer)
+        buffer.clear()
+        log(f"Committed {stats['ingested']} experts ({stats['ingested'] / (time.monotonic() - started):.1f}/s)")
+
+    def analyze(record):
+        links = ", ".join(record["links"])
+        # Cache hits cost no API quota, so they skip the rate limiter entirely
+        cached = ingest_expert.cached_analysis(record["name"], record["bio"], links)
+        if cached is not None:
+            return cached
+        # Already a miss: go straight to the model, but still cache the answer
+        return call_with_retries(
+            lambda: ingest_expert.request_analysis(record["name"], record["bio"], links, lookup=False),
+            retries=retries, limiter=limiter,
+        )
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool, open(errors_path, "a") as errors:
+        pending = {}
+
+        def drain(return_when):
+            done, _ = wait(pending, return_when=return_when)
+            for future in done:
+                record_no, record = pending.pop(future)
+                try:
+                    buffer.append((record_no, future.result(), record))
+                except Exception as e:
+                    stats["failed"] += 1
+                    errors.write(json.dumps({"record_no": record_no, "name": record["name"], "error": str(e)}) + "\n")
+                    errors.flush()
+            if len(buffer) >= chunk_size:
+                flush()
+
+        for record_no, record in iter_records(path):
+            if record_no in journal.done:
+                stats["skipped"] += 1
+                continue
+            if not record["name"] or not record["bio"]:
+                stats["invalid"] += 1
+                continue
+            # Bounded in-flight window keeps memory flat on huge files
+            while len(pending) >= concurrency * 2:
+                drain(FIRST_COMPLETED)
+            pending[pool.submit(analyze, record)] = (record_no, record)
+
+        while pending:
+            drain(FIRST_COMPLETED)
+        flush()
+
+    stats["seconds"] = round(time.monotonic() - started, 2)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-ingest experts from CSV or JSONL.")
+    parser.add_argument("path")
+    parser.add_argument("--concurrency", type=int, default=8, help="parallel analysis calls")
+    parser.add_argument("--rate", type=float, default=5.0, help="max LLM requests per second")
+    parser.add_argument("--chunk-size", type=int, default=100, help="experts per DB transaction")
+    parser.add_argument("--retries", type=int, default=4)
+    parser.add_argument("--stub", action="store_true", help="use the offline stub LLM")
+    parser.add_argument("--stub-latency", type=float, default=None)
+    parser.add_argument("--stub-failure-rate", type=float, default=None)
+    args = parser.parse_args()
+
+    if args.stub:
+        llm_client.use_stub(latency=args.stub_latency, failure_rate=args.stub_failure_rate)
+    if not llm_client.is_available():
+        raise SystemExit("❌ GOOGLE_API_KEY not found (or pass --stub).")
+
+    stats = ingest_file(args.path, args.concurrency, args.rate, args.chunk_size, args.retries)
+    print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import time
+import threading
+from sqlmodel import Session, select, func
+from sqlalchemy import update
+from models import CatalogState, Expert, engine, read_engine
+
+VERSION_KEY = "catalog_version"
+
+
+def _initial_version() -> int:
+    # Seeded from the wall clock so a dropped-and-recreated table (Reset/Nuke)
+    # never hands out a version that an old cache entry was keyed on.
+    return int(time.time() * 1000)
+
+
+def get_catalog_version(session: Session = None) -> int:
+    """ Current catalog version (creates the counter on first use). """
+    if session is None:
+        with Session(engine) as session:
+            return get_catalog_version(session)
+    version = session.execute(
+        select(CatalogState.value).where(CatalogState.key == VERSION_KEY)
+    ).scalar_one_or_none()
+    if version is None:
+        return bump_catalog_version()
+    return version
+
+
+def bump_catalog_version(session: Session = None) -> int:
+    """
+    Increments the catalog version. Pass the caller's session to make the bump
+    part of the same transaction as the write; otherwise it commits on its own.
+    """
+    if session is None:
+        with Session(engine) as session:
+            version = bump_catalog_version(session)
+            session.commit()
+            return version
+    # Atomic increment so concurrent writers never share a version
+    result = session.execute(
+        update(CatalogState)
+        .where(CatalogState.key == VERSION_KEY)
+        .values(value=CatalogState.value + 1)
+    )
+    if result.rowcount == 0:
+        session.add(CatalogState(key=VERSION_KEY, value=_initial_version()))
+        session.flush()
+    return session.execute(
+        select(CatalogState.value).where(CatalogState.key == VERSION_KEY)
+    ).scalar_one()
+
+
+# --- SNAPSHOT ---
+# Process-wide, read-only view of the catalog at one version, so Streamlit
+# reruns and per-query checks do not rescan the Expert table. Only cheap
+# data is held: the count eagerly, tag counts on first use.
+class CatalogSnapshot:
+    def __init__(self, version: int, count: int):
+        self.version = version
+        self.count = count
+        self._tags = None
+        self._tags_limit = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self.count
+
+    def tag_counts(self, limit: int = 50):
+        """ expert_tags.tag_counts() at this version; the GROUP BY runs once, not per rerun. """
+        import expert_tags  # imported here: expert_tags imports catalog
+        with self._lock:
+            # A shorter list than the last limit already holds every tag
+            if self._tags is None or (limit > self._tags_limit and len(self._tags) == self._tags_limit):
+                self._tags_limit = max(limit, self._tags_limit)
+                self._tags = expert_tags.tag_counts(limit=self._tags_limit)
+            return self._tags[:limit]
+
+
+_snapshot = None
+_snapshot_lock = threading.Lock()
+
+
+def expert_count(session: Session = None) -> int:
+    """ COUNT(*) straight from the table, for callers that need no snapshot. """
+    if session is None:
+        with Session(read_engine) as session:
+            return expert_count(session)
+    return session.exec(select(func.count()).select_from(Expert)).one()
+
+
+def get_snapshot() -> CatalogSnapshot:
+    """ The snapshot for the current catalog version, rebuilt after writes. """
+    global _snapshot
+    with Session(engine) as session:
+        version = get_catalog_version(session)
+        with _snapshot_lock:
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = CatalogSnapshot(version, expert_count(session))
+            return _snapshot
+
+
+# --- NAME BROWSING ---
+# The sidebar reads one page at a time, so render cost does not grow with the
+# catalog or with how often writes bump the version.
+def _name_filter(query: str):
+    # Case-insensitive for ASCII under SQLite's LIKE; % and _ in the query are literal
+    return Expert.name.contains(query.strip(), autoescape=True)
+
+
+def name_count(query: str = None) -> int:
+    """ How many experts' names contain query (all experts when it is empty). """
+    if not (query or "").strip():
+        return get_snapshot().count
+    with Session(read_engine) as session:
+        return session.exec(select(func.count()).select_from(Expert).where(_name_filter(query))).one()
+
+
+def name_page(query: str = None, page: int = 1, per_page: int = 25):
+    """ [(name, id)] for one page of names containing query, sorted by name (ix_expert_name). """
+    stmt = select(Expert.name, Expert.id).order_by(Expert.name)
+    if (query or "").strip():
+        stmt = stmt.where(_name_filter(query))
+    stmt = stmt.offset((max(1, page) - 1) * per_page).limit(per_page)
+    with Session(read_engine) as session:
+        return [tuple(r) for r in session.exec(stmt)]
+
+
+def expert_ids() -> set:
+    """ Every expert id (for callers reconciling side stores with the table). """
+    with Session(read_engine) as session:
+        return set(session.exec(select(Expert.id)).all())
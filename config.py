@@ -0,0 +1,26 @@
+import os
+
+# Central settings access. Every module reads its NEXA_* settings (and the API
+# key) through get(), so .env is loaded exactly once, on the first lookup, and
+# nothing else needs to call load_dotenv(). Real environment variables win
+# over .env, as load_dotenv never overrides them.
+
+_loaded = False
+
+
+def load():
+    """ Reads .env into the environment (once per process). """
+    global _loaded
+    if not _loaded:
+        _loaded = True
+        from dotenv import load_dotenv
+        load_dotenv()
+
+
+def get(name: str, default: str = None):
+    load()
+    return os.environ.get(name, default)
+
+
+def api_key():
+    return get("GOOGLE_API_KEY")
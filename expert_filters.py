@@ -0,0 +1,212 @@
+import re
+import threading
+import numpy as np
+from sqlmodel import Session, select, func
+from sqlalchemy import or_
+from models import Expert, ExpertTag, read_engine
+import catalog
+import expert_tags
+
+# Structured pre-filters applied before any scoring (see match_engine).
+#
+#   filters = {"max_rate": 150, "min_confidence": 80, "icp": "saas", "min_execution": 0.6,
+#              "tags": ["HubSpot"]}
+#
+# Two equivalent evaluations of the same dict:
+#   - conditions(filters): SQL WHERE clauses over indexed Expert columns
+#   - get_arrays().mask(filters): NumPy boolean mask over an in-memory copy of
+#     the numeric columns, rebuilt once per catalog version
+# An expert with no known rate is never excluded by a rate bound. "tags" requires
+# every listed domain tag and is resolved through the ExpertTag index.
+
+FILTER_KEYS = ("min_rate", "max_rate", "min_confidence", "icp", "min_strategy", "min_execution", "tags")
+
+# "1,500" is fifteen hundred: a comma only ever separates thousands, "." is the decimal point
+_NUMBER_RE = re.compile(r"(\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?)\s*(k)?", re.IGNORECASE)
+# Budgets for another period than an hour say nothing about the hourly rate
+_NON_HOURLY_RE = re.compile(
+    r"\b(mo|months?|monthly|yr|years?|yearly|annual(ly)?|wk|weeks?|weekly|days?|daily|project|retainer|fixed)\b"
+)
+
+
+def normalize(filters) -> dict:
+    """ Drops empty values and validates keys. Returns {} when nothing filters. """
+    if not filters:
+        return {}
+    unknown = set(filters) - set(FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown filter(s) {sorted(unknown)}. Use any of {FILTER_KEYS}.")
+    out = {}
+    for key in FILTER_KEYS:
+        value = filters.get(key)
+        if value is None or value == "":
+            continue
+        if key == "tags":
+            tags = sorted({expert_tags.normalize_tag(t) for t in ([value] if isinstance(value, str) else value)} - {""})
+            if tags:
+                out[key] = tags
+        elif key == "icp":
+            out[key] = value.strip().lower()
+        else:
+            out[key] = float(value)
+    return out
+
+
+def parse_budget_band(band: str) -> dict:
+    """
+    Reads an hourly rate range out of free text:
+    "$80-150/hr" -> 80..150, "under $200" -> ..200, "$300+" -> 300.., "1.5k" -> 1500,
+    "$1,500-2,000" -> 1500..2000, "5-10k" -> 5000..10000.
+    Returns {"min_rate", "max_rate"} with only the bounds that were found, and
+    {} for budgets per month, project etc. ("$1,500-2,000/month").
+    """
+    text = (band or "").lower()
+    if _NON_HOURLY_RE.search(text):
+        return {}
+    numbers = [(float(n.replace(",", "")), bool(k)) for n, k in _NUMBER_RE.findall(text)]
+    if len(numbers) >= 2:
+        (low, low_k), (high, high_k) = numbers[:2]
+        # A trailing "k" covers the whole range: "5-10k" is 5000..10000, but "500-1.5k" is 500..1500
+        if high_k and not low_k and low <= high:
+            numbers[0] = (low, True)
+    values = [n * (1000 if k else 1) for n, k in numbers]
+    if not values:
+        return {}
+    if len(values) >= 2:
+        return {"min_rate": min(values[:2]), "max_rate": max(values[:2])}
+    if "+" in text or any(w in text for w in ("over", "above", "at least", "min")):
+        return {"min_rate": values[0]}
+    return {"max_rate": values[0]}
+
+
+def need_filters(need) -> dict:
+    """ Filters implied by a stored SMENeed (its budget band). """
+    return parse_budget_band(need.budget_band)
+
+
+def conditions(filters):
+    """ SQLAlchemy WHERE clauses for the given (normalized) filters. """
+    f = normalize(filters)
+    clauses = []
+    if "min_rate" in f:
+        clauses.append(or_(Expert.rate.is_(None), Expert.rate >= f["min_rate"]))
+    if "max_rate" in f:
+        clauses.append(or_(Expert.rate.is_(None), Expert.rate <= f["max_rate"]))
+    if "min_confidence" in f:
+        clauses.append(Expert.confidence_score >= f["min_confidence"])
+    if "icp" in f:
+        clauses.append(Expert.icp_focus.ilike(f"%{f['icp']}%"))
+    if "min_strategy" in f:
+        clauses.append(Expert.strategy_share >= f["min_strategy"])
+    if "min_execution" in f:
+        clauses.append(Expert.execution_share >= f["min_execution"])
+    if "tags" in f:
+        tagged = (
+            select(ExpertTag.expert_id).where(ExpertTag.tag.in_(f["tags"]))
+            .group_by(ExpertTag.expert_id).having(func.count() == len(f["tags"]))
+        )
+        clauses.append(Expert.id.in_(tagged))
+    return clauses
+
+
+def passes(expert, filters) -> bool:
+    """ Single-row form, for experts already loaded as objects. """
+    f = normalize(filters)
+    rate = expert.rate
+    return not (
+        ("min_rate" in f and rate is not None and rate < f["min_rate"])
+        or ("max_rate" in f and rate is not None and rate > f["max_rate"])
+        or ("min_confidence" in f and (expert.confidence_score or 0) < f["min_confidence"])
+        or ("icp" in f and f["icp"] not in (expert.icp_focus or "").lower())
+        or ("min_strategy" in f and (expert.strategy_share is None or expert.strategy_share < f["min_strategy"]))
+        or ("min_execution" in f and (expert.execution_share is None or expert.execution_share < f["min_execution"]))
+        or ("tags" in f and not set(f["tags"]) <= {expert_tags.normalize_tag(d) for d in expert.domains or []})
+    )
+
+
+class FilterArrays:
+    """ Column-wise copy of the filterable fields; one row per expert, ordered by id. """
+    def __init__(self, rows):
+        """ rows: iterable of (id, rate, confidence_score, strategy_share, execution_share, icp_focus). """
+        rows = list(rows)
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        as_float = lambda i: np.array([np.nan if r[i] is None else r[i] for r in rows], dtype=np.float32)
+        self.rate = as_float(1)
+        self.confidence = as_float(2)
+        self.strategy = as_float(3)
+        self.execution = as_float(4)
+        self.unknown_rate = np.isnan(self.rate)
+        # icp_focus is free text: keep one code per distinct value
+        self.icp_values = {}
+        self.icp_codes = np.array(
+            [self.icp_values.setdefault((r[5] or "").lower(), len(self.icp_values)) for r in rows], dtype=np.int32
+        )
+
+    def mask(self, filters):
+        """ Boolean array (aligned with self.ids) of experts that pass, or None if nothing filters. """
+        f = normalize(filters)
+        if not f:
+            return None
+        keep = np.ones(len(self.ids), dtype=bool)
+        if "min_rate" in f:
+            keep &= self.unknown_rate | (self.rate >= f["min_rate"])
+        if "max_rate" in f:
+            keep &= self.unknown_rate | (self.rate <= f["max_rate"])
+        if "min_confidence" in f:
+            keep &= self.confidence >= f["min_confidence"]
+        if "min_strategy" in f:
+            keep &= self.strategy >= f["min_strategy"]
+        if "min_execution" in f:
+            keep &= self.execution >= f["min_execution"]
+        if "icp" in f:
+            codes = [c for value, c in self.icp_values.items() if f["icp"] in value]
+            if len(codes) <= 8:
+                # A few vectorized compares beat a gather over the whole catalog
+                icp = np.zeros(len(self.ids), dtype=bool)
+                for c in codes:
+                    icp |= self.icp_codes == c
+            else:
+                wanted = np.zeros(len(self.icp_values), dtype=bool)
+                wanted[codes] = True
+                icp = wanted[self.icp_codes]
+            keep &= icp
+        if "tags" in f:
+            keep &= np.isin(self.ids, expert_tags.experts_with_tags(f["tags"]))
+        return keep
+
+    def allowed_ids(self, filters):
+        """ Sorted ids that pass, or None if nothing filters. """
+        keep = self.mask(filters)
+        return None if keep is None else self.ids[keep]
+
+    def mask_for(self, ids, filters):
+        """ mask() re-aligned to another id array (e.g. the local ranker's rows). """
+        keep = self.mask(filters)
+        if keep is None:
+            return None
+        if np.array_equal(ids, self.ids):
+            return keep
+        return np.isin(ids, self.ids[keep])
+
+
+# --- PROCESS-WIDE INSTANCE ---
+_lock = threading.Lock()
+_arrays = None
+_arrays_version = None
+
+FILTER_COLUMNS = (
+    Expert.id, Expert.rate, Expert.confidence_score,
+    Expert.strategy_share, Expert.execution_share, Expert.icp_focus,
+)
+
+def get_arrays() -> FilterArrays:
+    """ Returns the arrays for the current catalog version, reloading them after writes. """
+    global _arrays, _arrays_version
+    version = catalog.get_catalog_version()
+    with _lock:
+        if _arrays is None or _arrays_version != version:
+            with Session(read_engine) as session:
+                rows = session.exec(select(*FILTER_COLUMNS).order_by(Expert.id)).all()
+            _arrays = FilterArrays(rows)
+            _arrays_version = version
+        return _arrays
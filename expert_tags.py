@@ -0,0 +1,112 @@
+import re
+from sqlmodel import Session, select, func
+from sqlalchemy import delete, insert, text
+from models import Expert, ExpertTag, engine, read_engine
+import catalog
+
+# Domain tags as an indexed table, so "which experts list HubSpot" and tag
+# facets are index lookups instead of deserializing every Expert.domains blob.
+# The (tag, expert_id) primary key doubles as the tag / prefix index.
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_tag(tag: str) -> str:
+    """ Case-folded, whitespace-collapsed form used as the lookup key. """
+    return _SPACE_RE.sub(" ", str(tag or "")).strip().casefold()
+
+
+# --- MAINTENANCE (called by ingest_expert inside the save transaction) ---
+def tag_experts(session: Session, experts):
+    """ Replaces the tag rows of the given experts. The caller owns the transaction. """
+    experts = list(experts)
+    if not experts:
+        return
+    remove_experts(session, [e.id for e in experts])
+    rows = []
+    for expert in experts:
+        seen = set()
+        for label in expert.domains or []:
+            tag = normalize_tag(label)
+            if tag and tag not in seen:
+                seen.add(tag)
+                rows.append({"tag": tag, "expert_id": expert.id, "label": str(label).strip()})
+    if rows:
+        session.execute(insert(ExpertTag), rows)
+
+
+def remove_experts(session: Session, expert_ids):
+    for i in range(0, len(expert_ids), 500):
+        session.execute(
+            delete(ExpertTag).where(ExpertTag.expert_id.in_(expert_ids[i:i + 500])),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def rebuild_tags(batch_size: int = 1000):
+    """ Drops and rebuilds the tag table from Expert.domains. """
+    with Session(engine) as session:
+        session.execute(delete(ExpertTag))
+        last_id = 0
+        while True:
+            batch = session.exec(
+                select(Expert).where(Expert.id > last_id).order_by(Expert.id).limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            tag_experts(session, batch)
+            last_id = batch[-1].id
+        # Snapshots cache tag counts per version
+        catalog.bump_catalog_version(session)
+        session.commit()
+
+
+def ensure_tags():
+    """ Backfills the tag table if it does not cover every tagged expert (e.g. an older DB). """
+    with Session(read_engine) as session:
+        tagged = session.exec(select(func.count(func.distinct(ExpertTag.expert_id)))).one()
+        expected = session.execute(
+            text("SELECT COUNT(*) FROM expert WHERE json_array_length(domains) > 0")
+        ).scalar_one()
+    if tagged != expected:
+        rebuild_tags()
+
+
+# --- QUERIES ---
+def experts_with_tags(tags, match_all: bool = True):
+    """ Sorted ids of experts carrying all (or, with match_all=False, any) of the tags. """
+    keys = sorted({normalize_tag(t) for t in tags if normalize_tag(t)})
+    if not keys:
+        return []
+    stmt = select(ExpertTag.expert_id).where(ExpertTag.tag.in_(keys)).group_by(ExpertTag.expert_id)
+    if match_all:
+        stmt = stmt.having(func.count() == len(keys))
+    with Session(read_engine) as session:
+        return list(session.exec(stmt.order_by(ExpertTag.expert_id)).all())
+
+
+def experts_with_tag(tag: str):
+    return experts_with_tags([tag])
+
+
+def tag_counts(prefix: str = None, limit: int = 50):
+    """ [(tag, label, experts)] most common first; prefix narrows to tags starting with it. """
+    stmt = select(ExpertTag.tag, func.min(ExpertTag.label), func.count()).group_by(ExpertTag.tag)
+    if prefix:
+        stmt = stmt.where(_prefix_clause(prefix))
+    stmt = stmt.order_by(func.count().desc(), ExpertTag.tag).limit(limit)
+    with Session(read_engine) as session:
+        return [tuple(row) for row in session.exec(stmt).all()]
+
+
+def suggest(prefix: str, limit: int = 10):
+    """ Tags starting with prefix (autocomplete), most common first. """
+    if not normalize_tag(prefix):
+        return []
+    return tag_counts(prefix, limit)
+
+
+def _prefix_clause(prefix: str):
+    # A range scan on the primary key; LIKE 'x%' would not use the index under NOCASE rules
+    key = normalize_tag(prefix)
+    return (ExpertTag.tag >= key) & (ExpertTag.tag < key + "\U0010ffff")
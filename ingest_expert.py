@@ -1,36 +1,27 @@
-import os
 import json
-import google.generativeai as genai
+import logging
+import llm_client
 from sqlmodel import Session, select
-from dotenv import load_dotenv
-from models import Expert, engine
+from sqlalchemy import or_, and_, func
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import Expert, engine, strength_shares
+import search_index
+import expert_tags
+import catalog
+import vector_index
+import llm_cache
+import match_digest
+import need_matcher
+import telemetry
 
-# Force Load Environment Variables (for local testing compatibility)
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-def analyze_profile(name: str, bio_text: str, links: str):
-    """
-    Uses Gemini to extract structured skills from raw text.
-    If it fails, it returns a visible error card, not mock data.
-    """
-    api_key = os.environ.get("GOOGLE_API_KEY")
-    
-    if not api_key:
-        # This should have been caught in app.py, but just in case
-        raise ValueError("❌ GOOGLE_API_KEY not found. Analysis failed.")
-
-    # Configure Gemini
-    genai.configure(api_key=api_key)
-    
-# FIX: Set the model to a stable, generally available name.
-    model_name = "gemini-2.5-flash" # Using the latest recommended stable name.
-    
-    # We remove the complex auto-discovery that was causing the 404 error.
-    
-    model = genai.GenerativeModel(model_name)
+# Bump whenever build_analysis_prompt changes, so cached analyses are not reused
+ANALYSIS_PROMPT_VERSION = "forensic-v1"
 
-    # The Forensic Prompt
-    system_prompt = f"""
+def build_analysis_prompt(name: str, bio_text: str, links: str) -> str:
+    """ The Forensic Prompt. """
+    return f"""
     You are a Forensic Data Extractor for an Expert Marketplace.
     
     INPUT PROFILE:
@@ -53,56 +44,156 @@ def analyze_profile(name: str, bio_text: str, links: str):
     }}
     """
 
-    try:
-        response = model.generate_content(system_prompt)
-        cleaned = response.text.strip().replace('```json', '').replace('```', '')
-        return json.loads(cleaned)
-    except Exception as e:
-        # 🚨 THIS IS THE FIX: Return a clear error message instead of mock data 🚨
-        print(f"ERROR in AI Analysis: {e}")
-        return {
-            "headline": "⚠️ AI ANALYSIS FAILED - Check Logs/Key",
-            "domains": ["Error"],
-            "icp_focus": "Unknown",
-            "strength_mix": {"Strategy": 0, "Execution": 0},
-            "confidence_score": 0,
-            "vetting_summary": f"Error Log: {str(e)}"
-        }
+def _analysis_cache_key(model, name, bio_text, links):
+    model_name = getattr(model, "model_name", llm_client.ANALYSIS_MODEL)
+    return llm_cache.make_key(model_name, ANALYSIS_PROMPT_VERSION, name, bio_text, links)
+
+def cached_analysis(name: str, bio_text: str, links: str):
+    """ Returns a previously cached analysis for these exact inputs, or None. """
+    if not llm_cache.ENABLED:
+        return None
+    model = llm_client.get_model(llm_client.ANALYSIS_MODEL)
+    return llm_cache.cache.get(_analysis_cache_key(model, name, bio_text, links))
+
+def request_analysis(name: str, bio_text: str, links: str, model=None, use_cache: bool = True, lookup: bool = True):
+    """
+    Single Gemini analysis call. Raises on API or JSON errors so callers
+    (bulk_ingest, and the UI through vetting_queue) can retry and record the failure.
+    Unchanged inputs are answered from the content-addressed llm_cache.
+    lookup=False skips the cache read but still stores the answer, for
+    callers that already checked (cached_analysis).
+    """
+    with telemetry.trace("analyze_profile") as t:
+        # Shared, already-configured client (no per-call genai.configure)
+        model = model or llm_client.get_model(llm_client.ANALYSIS_MODEL)
+
+        key = None
+        if use_cache and llm_cache.ENABLED:
+            key = _analysis_cache_key(model, name, bio_text, links)
+            if lookup:
+                with t.stage("cache_lookup"):
+                    cached = llm_cache.cache.get(key)
+                if cached is not None:
+                    t.incr("llm_cache_hit")
+                    return cached
+                t.incr("llm_cache_miss")
+
+        with t.stage("prompt_build"):
+            prompt = build_analysis_prompt(name, bio_text, links)
+        with t.stage("llm_call"):
+            response = model.generate_content(prompt)
+        telemetry.record_llm_usage(prompt, response)
+        with t.stage("json_parse"):
+            cleaned = response.text.strip().replace('```json', '').replace('```', '')
+            analysis = json.loads(cleaned)
+
+        if key:
+            llm_cache.cache.set(key, analysis)
+        return analysis
+
+# Columns written by an analysis; everything except the natural key (name)
+UPSERT_COLUMNS = [
+    "headline", "domains", "icp_focus", "strength_mix", "strategy_share", "execution_share",
+    "confidence_score", "vetting_summary", "mini_case_response", "links",
+    "match_digest", "digest_version",
+]
+# Rows per INSERT statement (keeps us well under SQLite's bound-parameter limit)
+UPSERT_CHUNK = 500
+
+def _expert_row(analysis_data, name, bio, links):
+    strength_mix = analysis_data.get("strength_mix", {})
+    strategy_share, execution_share = strength_shares(strength_mix)
+    headline = analysis_data.get("headline", "New Expert")
+    domains = analysis_data.get("domains", [])
+    icp_focus = analysis_data.get("icp_focus", "General")
+    return {
+        "name": name,
+        "headline": headline,
+        "domains": domains,
+        "icp_focus": icp_focus,
+        "strength_mix": strength_mix,
+        "strategy_share": strategy_share,
+        "execution_share": execution_share,
+        "confidence_score": analysis_data.get("confidence_score", 50),
+        "vetting_summary": analysis_data.get("vetting_summary", ""),
+        "mini_case_response": bio, # Storing raw bio as case response for now
+        "links": links,
+        # Built once here so match prompts never re-derive it per query
+        "match_digest": match_digest.build_digest(headline, domains, icp_focus),
+        "digest_version": match_digest.DIGEST_VERSION,
+        # Analyses never carry a rate; imports may (None keeps the stored rate)
+        "rate": analysis_data.get("rate"),
+    }
+
+def _upsert_rows(session, rows):
+    """
+    Native SQLite upsert on the unique name index.
+    Returns the ids of rows that were inserted or actually changed: the
+    DO UPDATE only fires when some column differs, so no-op re-saves are skipped.
+    """
+    stmt = sqlite_insert(Expert).values(rows)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Expert.name],
+        set_={**{c: excluded[c] for c in UPSERT_COLUMNS}, "rate": func.coalesce(excluded.rate, Expert.rate)},
+        where=or_(
+            *[getattr(Expert, c).is_distinct_from(excluded[c]) for c in UPSERT_COLUMNS],
+            and_(excluded.rate.is_not(None), Expert.rate.is_distinct_from(excluded.rate)),
+        ),
+    ).returning(Expert.id)
+    return [row[0] for row in session.execute(stmt)]
 
 def save_expert(analysis_data, name, bio, links):
     """
     Saves the analyzed expert to the DB.
     """
-    with Session(engine) as session:
-        # Check if expert exists (by name) and update, or create new
-        existing_expert = session.exec(select(Expert).where(Expert.name == name)).first()
-        
-        if existing_expert:
-            expert = existing_expert
-            # Update fields
-            expert.headline = analysis_data.get("headline", "New Expert")
-            expert.domains = analysis_data.get("domains", [])
-            expert.icp_focus = analysis_data.get("icp_focus", "General")
-            expert.strength_mix = analysis_data.get("strength_mix", {})
-            expert.confidence_score = analysis_data.get("confidence_score", 50)
-            expert.vetting_summary = analysis_data.get("vetting_summary", "")
-            expert.mini_case_response = bio # Storing raw bio as case response for now
-            expert.links = links
-        else:
-            # Create new
-            expert = Expert(
-                name=name,
-                headline=analysis_data.get("headline", "New Expert"),
-                domains=analysis_data.get("domains", []),
-                icp_focus=analysis_data.get("icp_focus", "General"),
-                strength_mix=analysis_data.get("strength_mix", {}),
-                confidence_score=analysis_data.get("confidence_score", 50),
-                vetting_summary=analysis_data.get("vetting_summary", ""),
-                mini_case_response=bio,
-                links=links
-            )
-            session.add(expert)
-        
+    return save_experts([(analysis_data, name, bio, links)])[0]
+
+def save_experts(batch):
+    """
+    Upserts many analyzed experts in a single transaction.
+    batch: iterable of (analysis_data, name, bio, links) tuples.
+    Rows whose analysis is unchanged are not rewritten, reindexed or re-embedded.
+    Returns the Expert rows in batch order.
+    """
+    rows = [_expert_row(*item) for item in batch]
+    if not rows:
+        return []
+
+    with telemetry.trace("save_experts", rows=len(rows)) as t:
+        return _save_rows(rows, t)
+
+def _save_rows(rows, t):
+    with t.stage("db_commit"), Session(engine, expire_on_commit=False) as session:
+        names = list({row["name"] for row in rows})
+        # Pre-save values, so need rescoring can skip edits that cannot move a match
+        previous = need_matcher.match_fields(session, names)
+        changed_ids = []
+        for i in range(0, len(rows), UPSERT_CHUNK):
+            changed_ids += _upsert_rows(session, rows[i:i + UPSERT_CHUNK])
+
+        by_name = {}
+        for i in range(0, len(names), UPSERT_CHUNK):
+            for expert in session.exec(select(Expert).where(Expert.name.in_(names[i:i + UPSERT_CHUNK]))):
+                by_name[expert.name] = expert
+
+        changed_set = set(changed_ids)
+        changed = [e for e in by_name.values() if e.id in changed_set]
+        if changed:
+            # Keep the BM25 shortlist index and tag table in step with the rows (same transaction)
+            search_index.index_experts(session, changed)
+            expert_tags.tag_experts(session, changed)
+            catalog.bump_catalog_version(session)
         session.commit()
-        session.refresh(expert)
-        return expert
+
+    t.add(changed=len(changed))
+    # Embed once at ingest so queries only pay for the query embedding
+    with t.stage("embed"):
+        vector_index.add_experts(changed)
+    # Keep precomputed SME matches current; the expert itself is already saved
+    with t.stage("need_rescore"):
+        try:
+            need_matcher.rescore_experts(changed, previous)
+        except Exception:
+            logger.exception("Rescoring open needs failed")
+    return [by_name[row["name"]] for row in rows]
@@ -0,0 +1,71 @@
+import json
+
+# Incremental parser for a streamed JSON array of objects, e.g. a model answer
+# arriving in chunks as  ```json\n[ {...}, {...} ]```.
+#
+#   parser = ArrayItemParser()
+#   for chunk in response:
+#       for item in parser.feed(chunk.text):
+#           ...  # each top-level object as soon as its closing brace arrives
+#
+# Anything before the opening '[' (code fences, chatter) is skipped; a '[' only
+# opens the array when the next non-space character is '{' or ']', so a
+# preamble like "Here are [3] picks:" is skipped too. Only the characters
+# after the last complete item are buffered.
+
+
+class ArrayItemParser:
+    def __init__(self):
+        self._buf = []
+        self._started = False   # seen the opening '['
+        self._bracket = False   # seen a '[' that may open the array
+        self._done = False      # seen the closing ']'
+        self._depth = 0         # nesting depth inside the current item
+        self._in_string = False
+        self._escaped = False
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, text: str):
+        """ Consumes a chunk and returns the items it completed (possibly none). """
+        items = []
+        for ch in text or "":
+            if self._done:
+                break
+            if not self._started:
+                if self._bracket and ch.isspace():
+                    continue
+                if self._bracket and ch in "{]":
+                    self._started = True
+                else:
+                    self._bracket = ch == "["
+                    continue
+            if self._depth == 0:
+                # Between items: only '{' (start) and ']' (end) matter
+                if ch == "{":
+                    self._depth = 1
+                    self._buf = [ch]
+                elif ch == "]":
+                    self._done = True
+                continue
+
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    items.append(json.loads("".join(self._buf)))
+                    self._buf = []
+        return items
@@ -0,0 +1,98 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from contextlib import contextmanager
+import config
+from models import cache_file_name, apply_pragmas
+
+# Content-addressed cache of LLM analysis responses.
+# The key is a hash of (model, prompt template version, inputs), so re-vetting
+# an unchanged profile is a local lookup instead of an API call. Stored in the
+# same side database as the match cache; oldest entries are evicted once the
+# stored payload exceeds NEXA_LLM_CACHE_MAX_BYTES.
+
+MAX_BYTES = int(config.get("NEXA_LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+ENABLED = config.get("NEXA_LLM_CACHE", "on") != "off"
+
+
+def make_key(model_name: str, prompt_version: str, *inputs) -> str:
+    h = hashlib.sha256()
+    for part in (model_name, prompt_version) + inputs:
+        h.update(str(part).encode("utf-8"))
+        h.update(b"\x00")
+    return h.hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: str = cache_file_name, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        apply_pragmas(conn)
+        try:
+            with conn:
+                if not self._ready:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS llm_cache ("
+                        " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                        " size INTEGER NOT NULL, last_access REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_last_access ON llm_cache(last_access)")
+                    self._ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            conn.execute("UPDATE llm_cache SET last_access = ? WHERE key = ?", (time.time(), key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key, value):
+        payload = json.dumps(value)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, payload, len(payload), time.time()),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Drop least recently used rows until we are back under budget
+        freed = 0
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY last_access"):
+            doomed.append((key,))
+            freed += size
+            if total - freed <= self.max_bytes:
+                break
+        conn.executemany("DELETE FROM llm_cache WHERE key = ?", doomed)
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM llm_cache")
+
+    def stats(self):
+        with self._connect() as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache").fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": size}
+
+
+cache = LLMCache()
@@ -0,0 +1,143 @@
+import time
+import logging
+import threading
+import config
+
+# Shared Gemini client layer.
+# Module globals survive Streamlit reruns and are shared by every session in
+# the process, so configure/list_models/GenerativeModel happen once, not per call.
+# The SDK itself is imported on first use (genai()); it is the slowest import in
+# the app and neither stub mode nor the local ranker ever touches it.
+
+logger = logging.getLogger(__name__)
+
+MODEL_TTL_SECONDS = float(config.get("NEXA_MODEL_TTL", "3600"))
+
+# "gemini" (default) or "stub" for the offline deterministic model in stub_llm.py
+LLM_BACKEND = config.get("NEXA_LLM", "gemini")
+STUB_LATENCY = float(config.get("NEXA_STUB_LATENCY", "0"))
+STUB_FAILURE_RATE = float(config.get("NEXA_STUB_FAILURE_RATE", "0"))
+
+# Stable model used for expert analysis (auto-discovery caused 404s there)
+ANALYSIS_MODEL = "gemini-2.5-flash"
+
+_lock = threading.Lock()
+_configured_key = None
+_resolved_model = None     # auto-discovered model name
+_resolved_at = 0.0
+_models = {}               # model name -> GenerativeModel
+_genai = None              # google.generativeai, once imported
+
+
+def genai():
+    """ The google.generativeai module, imported on first call. """
+    global _genai
+    if _genai is None:
+        import google.generativeai
+        _genai = google.generativeai
+    return _genai
+
+
+def use_stub(latency: float = None, failure_rate: float = None):
+    """ Switches this process to the offline stub model. """
+    global LLM_BACKEND, STUB_LATENCY, STUB_FAILURE_RATE
+    with _lock:
+        LLM_BACKEND = "stub"
+        if latency is not None:
+            STUB_LATENCY = latency
+        if failure_rate is not None:
+            STUB_FAILURE_RATE = failure_rate
+        _models.clear()
+
+
+def is_available() -> bool:
+    """ True when get_model() can return something (API key set, or stub mode). """
+    return LLM_BACKEND == "stub" or bool(config.api_key())
+
+
+def _configure():
+    """ Configures the SDK once per API key. Caller holds the lock. """
+    global _configured_key, _resolved_model
+    api_key = config.api_key()
+    if not api_key:
+        raise ValueError("❌ GOOGLE_API_KEY not found.")
+    if api_key != _configured_key:
+        genai().configure(api_key=api_key)
+        _configured_key = api_key
+        # A new key may see a different model list
+        _resolved_model = None
+        _models.clear()
+
+
+def _discover_model():
+    """ Picks a generateContent model, preferring gemini-1.5, then any gemini. """
+    available_models = [
+        m.name for m in genai().list_models()
+        if 'generateContent' in m.supported_generation_methods
+    ]
+    model_name = next((m for m in available_models if 'gemini-1.5' in m), None)
+    if not model_name:
+        model_name = next((m for m in available_models if 'gemini' in m), available_models[0])
+    return model_name
+
+
+def resolve_model_name():
+    """ Returns the auto-discovered model name, re-discovering after the TTL. """
+    global _resolved_model, _resolved_at
+    with _lock:
+        _configure()
+        if _resolved_model is None or time.monotonic() - _resolved_at > MODEL_TTL_SECONDS:
+            _resolved_model = _discover_model()
+            _resolved_at = time.monotonic()
+            logger.info("Selected Model: %s", _resolved_model)
+        return _resolved_model
+
+
+def get_model(model_name: str = None):
+    """
+    Returns a configured, cached GenerativeModel.
+    With no model_name, the auto-discovered model is used.
+    """
+    if LLM_BACKEND == "stub":
+        with _lock:
+            model = _models.get("stub")
+            if model is None:
+                from stub_llm import StubModel
+                model = StubModel(latency=STUB_LATENCY, failure_rate=STUB_FAILURE_RATE)
+                _models["stub"] = model
+            return model
+
+    if model_name is None:
+        model_name = resolve_model_name()
+    with _lock:
+        _configure()
+        model = _models.get(model_name)
+        if model is None:
+            model = genai().GenerativeModel(model_name)
+            _models[model_name] = model
+        return model
+
+
+def configure():
+    """ Makes sure the SDK is configured (for direct genai calls such as embeddings). """
+    with _lock:
+        _configure()
+
+
+def is_model_not_found(error: Exception) -> bool:
+    """
+    True for a 404 (model retired or renamed), the one failure invalidate()
+    can fix. Rate limits, timeouts and bad answers keep the resolved model.
+    """
+    # google.api_core's NotFound carries code 404; checked without importing the SDK
+    code = getattr(error, "code", None)
+    code = code() if callable(code) else code
+    return code == 404 or type(error).__name__ == "NotFound" or str(error).startswith("404")
+
+
+def invalidate():
+    """ Forgets the discovered model (e.g. after it starts failing). """
+    global _resolved_model
+    with _lock:
+        _resolved_model = None
+        _models.clear()
@@ -0,0 +1,221 @@
+import math
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from sqlmodel import Session, select
+from models import Expert, read_engine
+from search_index import tokenize
+import catalog
+import expert_filters
+
+# Offline ranking engine (PATH B of match_engine).
+# Everything query-independent is precomputed into NumPy arrays once per
+# catalog version; a query only touches the postings of its own terms, so
+# ranking 100k experts is a handful of vectorized adds plus one argpartition.
+
+# Blend of the three signals (sums to 1)
+TEXT_WEIGHT = 0.55
+TAG_WEIGHT = 0.30
+PRIOR_WEIGHT = 0.15
+
+# Query words that signal whether the SME wants thinking or doing
+STRATEGY_WORDS = {"strategy", "strategic", "plan", "planning", "roadmap", "advice", "advisor", "audit", "direction", "positioning", "gtm"}
+EXECUTION_WORDS = {"build", "setup", "set", "implement", "implementation", "execute", "automate", "automation", "migrate", "launch", "fix", "hands"}
+
+
+class LocalRanker:
+    def __init__(self, rows):
+        """ rows: iterable of (id, name, headline, domains, icp_focus, vetting_summary, strength_mix, confidence_score). """
+        rows = list(rows)
+        self.size = len(rows)
+        self.ids = np.array([r[0] for r in rows], dtype=np.int64)
+        self.names = [r[1] for r in rows]
+        self.tags = [list(r[3] or []) for r in rows]
+
+        self.confidence = np.array([(r[7] or 0) / 100.0 for r in rows], dtype=np.float32)
+        mixes = [{str(k).lower(): float(v or 0) for k, v in (r[6] or {}).items()} for r in rows]
+        self.strategy = np.array([m.get("strategy", 0.5) for m in mixes], dtype=np.float32)
+        self.execution = np.array([m.get("execution", 0.5) for m in mixes], dtype=np.float32)
+
+        # --- TF-IDF postings over expert text ---
+        term_docs = defaultdict(list)
+        for doc, r in enumerate(rows):
+            for term, tf in Counter(tokenize(_row_text(r))).items():
+                term_docs[term].append((doc, tf))
+
+        self.idf = {t: math.log((1 + self.size) / (1 + len(d))) + 1 for t, d in term_docs.items()}
+        sq_norms = np.zeros(self.size, dtype=np.float64)
+        raw = {}
+        for term, docs in term_docs.items():
+            idx = np.fromiter((d for d, _ in docs), dtype=np.int32, count=len(docs))
+            w = np.fromiter(((1 + math.log(tf)) * self.idf[term] for _, tf in docs), dtype=np.float64, count=len(docs))
+            raw[term] = (idx, w)
+            sq_norms[idx] += w * w
+        norms = np.sqrt(sq_norms)
+        norms[norms == 0] = 1.0
+        # Unit-length doc vectors, so a query dot product is a cosine
+        self.postings = {t: (idx, (w / norms[idx]).astype(np.float32)) for t, (idx, w) in raw.items()}
+
+        # --- Domain-tag postings (tag tokens -> docs, weighted by 1/#tags) ---
+        tag_docs = defaultdict(dict)
+        for doc, tags in enumerate(self.tags):
+            share = 1.0 / max(1, len(tags))
+            for tag in tags:
+                for term in tokenize(tag):
+                    tag_docs[term][doc] = tag_docs[term].get(doc, 0.0) + share
+        self.tag_postings = {
+            t: (np.fromiter(d.keys(), dtype=np.int32, count=len(d)), np.fromiter(d.values(), dtype=np.float32, count=len(d)))
+            for t, d in tag_docs.items()
+        }
+
+    def score(self, query: str, mask=None):
+        """ Returns (scores, matched_terms) for every expert; mask (bool array) excludes rows. """
+        terms = sorted(set(tokenize(query)))
+        text = np.zeros(self.size, dtype=np.float32)
+        tags = np.zeros(self.size, dtype=np.float32)
+
+        q_weights = {t: self.idf[t] for t in terms if t in self.idf}
+        q_norm = math.sqrt(sum(w * w for w in q_weights.values())) or 1.0
+        for term, qw in q_weights.items():
+            idx, w = self.postings[term]
+            text[idx] += w * (qw / q_norm)   # term postings are unique per doc
+        for term in terms:
+            if term in self.tag_postings:
+                idx, w = self.tag_postings[term]
+                tags[idx] += w
+        np.clip(tags, 0, 1, out=tags)
+
+        s_w, e_w = _intent(terms)
+        prior = 0.7 * self.confidence + 0.3 * (s_w * self.strategy + e_w * self.execution)
+
+        scores = TEXT_WEIGHT * text + TAG_WEIGHT * tags + PRIOR_WEIGHT * prior
+        relevant = (text > 0) | (tags > 0)
+        if relevant.any():
+            # Priors only break ties between relevant experts
+            scores[~relevant] = 0
+        if mask is not None:
+            scores[~mask] = -1
+        return scores, list(q_weights)
+
+    def score_rows(self, query: str, rows):
+        """
+        Scores experts that need not be in this snapshot (e.g. just saved), using
+        the snapshot's IDF table. Same blend and 0-100 scale as rank().
+        rows: same tuple layout as the constructor. Returns one int score per row.
+        """
+        terms = sorted(set(tokenize(query)))
+        default_idf = math.log(1 + self.size) + 1
+        q_weights = {t: self.idf.get(t, default_idf) for t in terms}
+        # Normalize over the terms rank() sees (those in the snapshot), so both share one scale
+        q_norm = math.sqrt(sum(w * w for t, w in q_weights.items() if t in self.idf)) or 1.0
+        s_w, e_w = _intent(terms)
+
+        out = []
+        for r in rows:
+            weights = {t: (1 + math.log(tf)) * self.idf.get(t, default_idf) for t, tf in Counter(tokenize(_row_text(r))).items()}
+            d_norm = math.sqrt(sum(w * w for w in weights.values())) or 1.0
+            text = sum(weights.get(t, 0.0) * qw for t, qw in q_weights.items()) / (d_norm * q_norm)
+
+            tags = list(r[3] or [])
+            share = 1.0 / max(1, len(tags))
+            tag_terms = [term for tag in tags for term in tokenize(tag)]
+            tag = min(1.0, sum(share * tag_terms.count(t) for t in terms))
+
+            if not text and not tag:
+                out.append(0)
+                continue
+            mix = {str(k).lower(): float(v or 0) for k, v in (r[6] or {}).items()}
+            prior = 0.7 * (r[7] or 0) / 100.0 + 0.3 * (s_w * mix.get("strategy", 0.5) + e_w * mix.get("execution", 0.5))
+            score = TEXT_WEIGHT * text + TAG_WEIGHT * tag + PRIOR_WEIGHT * prior
+            out.append(int(round(min(1.0, score) * 100)))
+        return out
+
+    def rank(self, query: str, top_n: int = 3, mask=None):
+        """ Top-n matches in the {expert_name, score, reason} shape used by the UI. """
+        if not self.size:
+            return []
+        scores, terms = self.score(query, mask)
+        n = min(top_n, self.size)
+        top = np.argpartition(-scores, n - 1)[:n]
+        top = top[np.argsort(-scores[top])]
+
+        results = []
+        for i in top:
+            # -1 is masked out; 0 is irrelevant while other experts match the query
+            if scores[i] <= 0:
+                continue
+            hits = [t for t in terms if _contains(self.postings[t][0], i)]
+            why = f"Matches on {', '.join(hits[:5])}" if hits else "Strongest available profile"
+            results.append({
+                "expert_name": self.names[i],
+                "score": int(round(min(1.0, float(scores[i])) * 100)),
+                "reason": f"🧭 [LOCAL MATCH]: {why} · confidence {int(self.confidence[i] * 100)}",
+            })
+        return results
+
+
+def _row_text(r) -> str:
+    return " ".join([r[1] or "", r[2] or "", " ".join(r[3] or []), r[4] or "", r[5] or ""])
+
+
+def _intent(terms):
+    """ (strategy, execution) weights implied by the query words. """
+    words = set(terms)
+    wants_strategy = len(words & STRATEGY_WORDS)
+    wants_execution = len(words & EXECUTION_WORDS)
+    total = wants_strategy + wants_execution
+    return (wants_strategy / total, wants_execution / total) if total else (0.5, 0.5)
+
+
+def _contains(sorted_idx, doc) -> bool:
+    pos = np.searchsorted(sorted_idx, doc)
+    return pos < len(sorted_idx) and sorted_idx[pos] == doc
+
+
+# --- PROCESS-WIDE INSTANCE ---
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_ranker = None
+_ranker_version = None
+
+RANKER_COLUMNS = (
+    Expert.id, Expert.name, Expert.headline, Expert.domains, Expert.icp_focus,
+    Expert.vetting_summary, Expert.strength_mix, Expert.confidence_score,
+)
+
+def get_ranker(allow_stale: bool = False) -> LocalRanker:
+    """
+    Returns the ranker for the current catalog version, rebuilding it after writes.
+    While one thread rebuilds, other callers keep using the previous ranker
+    instead of queueing behind it. allow_stale=True reuses any already-built
+    ranker (for IDF stats only).
+    """
+    global _ranker, _ranker_version
+    stale = _ranker
+    if allow_stale and stale is not None:
+        return stale
+    version = catalog.get_catalog_version()
+    if stale is not None and _ranker_version == version:
+        return stale
+    if stale is not None:
+        if not _build_lock.acquire(blocking=False):
+            return stale
+    else:
+        # Nothing to serve yet: wait for whoever is building the first one
+        _build_lock.acquire()
+    try:
+        if _ranker is not None and _ranker_version == version:
+            return _ranker
+        with Session(read_engine) as session:
+            rows = session.exec(select(*RANKER_COLUMNS).order_by(Expert.id)).all()
+        ranker = LocalRanker(rows)
+        with _lock:
+            _ranker, _ranker_version = ranker, version
+        return ranker
+    finally:
+        _build_lock.release()
+
+def rank(sme_text: str, top_n: int = 3, filters=None):
+    ranker = get_ranker()
+    mask = expert_filters.get_arrays().mask_for(ranker.ids, filters) if filters else None
+    return ranker.rank(sme_text, top_n, mask)
@@ -0,0 +1,183 @@
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import config
+from models import cache_file_name, apply_pragmas
+
+# Result cache for find_best_matches.
+# Keys combine the normalized SME text with the catalog version, so any write
+# to the Expert table (which bumps the version) makes old entries unreachable.
+
+CACHE_BACKEND = config.get("NEXA_MATCH_CACHE", "memory")   # memory | sqlite | off
+CACHE_TTL_SECONDS = float(config.get("NEXA_MATCH_CACHE_TTL", "3600"))
+CACHE_MAX_ENTRIES = int(config.get("NEXA_MATCH_CACHE_SIZE", "1024"))
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text: str) -> str:
+    """ Case, punctuation and whitespace insensitive form of an SME query. """
+    text = _PUNCT_RE.sub(" ", (text or "").lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def make_key(sme_text: str, catalog_version: int, *extra) -> str:
+    raw = "|".join([normalize_query(sme_text), str(catalog_version)] + [str(x) for x in extra])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# --- BACKENDS ---
+class MemoryBackend:
+    """ In-process LRU with per-entry TTL. """
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires_at, value = item
+            if expires_at < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """ LRU/TTL cache in a side SQLite file, so popular queries survive restarts. """
+    def __init__(self, path: str = cache_file_name, max_entries: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._ready = False
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        apply_pragmas(conn)
+        try:
+            with conn:
+                if not self._ready:
+                    # Created on first use, not at import (the module-level cache is built then)
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS match_cache ("
+                        " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                        " expires_at REAL NOT NULL, last_access REAL NOT NULL)"
+                    )
+                    conn.execute("CREATE INDEX IF NOT EXISTS ix_match_cache_last_access ON match_cache(last_access)")
+                    self._ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, expires_at FROM match_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                conn.execute("DELETE FROM match_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE match_cache SET last_access = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def set(self, key, value):
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO match_cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            conn.execute("DELETE FROM match_cache WHERE expires_at < ?", (now,))
+            conn.execute(
+                "DELETE FROM match_cache WHERE key IN ("
+                " SELECT key FROM match_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM match_cache")
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM match_cache").fetchone()[0]
+
+
+# --- CACHE FRONT ---
+class MatchCache:
+    """ Stores match lists as JSON (so callers never share mutable results) and counts hits/misses. """
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(value)
+
+    def set(self, key, results):
+        if self.enabled:
+            self.backend.set(key, json.dumps(results))
+
+    def clear(self):
+        if self.enabled:
+            self.backend.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "backend": type(self.backend).__name__ if self.enabled else "off",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.backend) if self.enabled else 0,
+        }
+
+
+def _default_backend():
+    if CACHE_BACKEND == "sqlite":
+        return SQLiteBackend()
+    if CACHE_BACKEND == "memory":
+        return MemoryBackend()
+    return None
+
+
+cache = MatchCache(_default_backend())
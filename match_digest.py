@@ -0,0 +1,146 @@
+import logging
+from sqlmodel import Session, select
+from sqlalchemy import or_, update, bindparam
+import config
+from models import Expert, engine
+import catalog
+import search_index
+
+# Compact, token-budgeted candidate lines for the match prompt.
+# The digest is built once at save time (ingest_expert) and stored on the
+# Expert row with DIGEST_VERSION; prompt assembly only concatenates stored
+# digests until NEXA_PROMPT_TOKEN_BUDGET is reached.
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever build_digest changes, so stored digests are regenerated
+DIGEST_VERSION = 1
+# Per-expert cap; ~4 chars per token, the same estimate telemetry uses
+DIGEST_MAX_TOKENS = int(config.get("NEXA_DIGEST_MAX_TOKENS", "32"))
+# "- Name: <name> | " around each digest
+LINE_OVERHEAD_TOKENS = 10
+# Cap for the whole candidate block of one prompt. The default holds a full
+# default shortlist, so only larger shortlists (explicit top_k) need a tournament.
+PROMPT_TOKEN_BUDGET = int(config.get(
+    "NEXA_PROMPT_TOKEN_BUDGET", str(search_index.SHORTLIST_K * (DIGEST_MAX_TOKENS + LINE_OVERHEAD_TOKENS))
+))
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def build_digest(headline: str, domains, icp_focus: str, max_tokens: int = DIGEST_MAX_TOKENS) -> str:
+    """
+    "Facebook Ads | Conversion API · Shopify, Klaviyo · DTC e-commerce"
+    Skills already named in the headline are not repeated; the result is cut
+    at a separator so it never exceeds max_tokens.
+    """
+    headline = " ".join((headline or "").split())
+    seen = headline.casefold()
+    skills = []
+    for d in domains or []:
+        d = " ".join(str(d).split())
+        if d and d.casefold() not in seen:
+            skills.append(d)
+            seen += " " + d.casefold()
+    parts = [p for p in (headline, ", ".join(skills), " ".join((icp_focus or "").split())) if p]
+    digest = " · ".join(parts)
+
+    limit = max_tokens * 4
+    if len(digest) <= limit:
+        return digest
+    cut = digest[:limit]
+    for sep in (" · ", ", ", " | ", " "):
+        pos = cut.rfind(sep)
+        if pos > limit // 2:
+            return cut[:pos]
+    return cut
+
+
+def digest_of(expert) -> str:
+    """ The stored digest when current, else one built on the fly (older rows). """
+    if getattr(expert, "digest_version", None) == DIGEST_VERSION and expert.match_digest:
+        return expert.match_digest
+    return build_digest(expert.headline, expert.domains, getattr(expert, "icp_focus", ""))
+
+
+def candidate_line(expert) -> str:
+    return f"- Name: {expert.name} | {digest_of(expert)}"
+
+
+def candidate_lines(experts, budget: int = PROMPT_TOKEN_BUDGET):
+    """
+    Prompt lines for experts in order, stopping once the token budget is spent.
+    Returns (lines, number of experts left out).
+    """
+    lines, used = [], 0
+    for i, e in enumerate(experts):
+        line = candidate_line(e)
+        cost = estimate_tokens(line)
+        if lines and used + cost > budget:
+            return lines, len(experts) - i
+        lines.append(line)
+        used += cost
+    return lines, 0
+
+
+def fits_budget(experts, budget: int = PROMPT_TOKEN_BUDGET) -> bool:
+    """ True when candidate_lines would keep every expert. """
+    return candidate_lines(experts, budget)[1] == 0
+
+
+def budget_chunks(experts, budget: int = PROMPT_TOKEN_BUDGET, max_size: int = None):
+    """
+    Splits experts, in order, into consecutive chunks that each fit one prompt's
+    budget (and hold at most max_size experts), so ranking chunk by chunk never
+    leaves a candidate out. Chunks are evened out where the budget allows,
+    rather than leaving a near-empty last one.
+    """
+    costs = [estimate_tokens(candidate_line(e)) for e in experts]
+    chunks = _pack(experts, costs, budget, max_size)
+    if len(chunks) > 1:
+        even = -(-len(experts) // len(chunks))
+        balanced = _pack(experts, costs, budget, even)
+        if len(balanced) == len(chunks):
+            return balanced
+    return chunks
+
+
+def _pack(experts, costs, budget, max_size):
+    chunks, chunk, used = [], [], 0
+    for e, cost in zip(experts, costs):
+        if chunk and (used + cost > budget or (max_size and len(chunk) >= max_size)):
+            chunks.append(chunk)
+            chunk, used = [], 0
+        chunk.append(e)
+        used += cost
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def backfill_digests(batch_size: int = 1000) -> int:
+    """ Regenerates missing or outdated digests in place. Returns how many rows changed. """
+    changed = 0
+    with Session(engine) as session:
+        while True:
+            rows = session.exec(
+                select(Expert.id, Expert.headline, Expert.domains, Expert.icp_focus)
+                .where(or_(Expert.digest_version.is_(None), Expert.digest_version != DIGEST_VERSION))
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            session.connection().execute(
+                update(Expert.__table__).where(Expert.__table__.c.id == bindparam("row_id")),
+                [{"row_id": r.id, "match_digest": build_digest(r.headline, r.domains, r.icp_focus),
+                  "digest_version": DIGEST_VERSION} for r in rows],
+            )
+            changed += len(rows)
+        if changed:
+            catalog.bump_catalog_version(session)
+        session.commit()
+    if changed:
+        logger.info("Regenerated %d match digests", changed)
+    return changed
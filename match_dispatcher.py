@@ -0,0 +1,249 @@
+"""
+Shared front for concurrent match requests (what app.py calls).
+
+    match_dispatcher.find_best_matches(sme_text, mode="hybrid", filters=None)
+    match_dispatcher.stream_best_matches(sme_text, mode="hybrid", filters=None)
+
+Same arguments and result format as match_engine.find_best_matches /
+stream_best_matches, plus:
+  - single-flight: identical queries already in flight share one pending call
+    (a streamed leader's joiners receive its final list)
+  - micro-batching: distinct LLM queries arriving within NEXA_DISPATCH_WINDOW
+    seconds are ranked with one multi-query prompt, and every caller gets
+    back only its own results
+Local-ranker queries skip both; they answer in milliseconds without an API call.
+"""
+import json
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+import config
+import llm_client
+import match_engine
+import match_cache
+import expert_filters
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+# How long the first query of a batch waits for company, and the batch cap
+BATCH_WINDOW = float(config.get("NEXA_DISPATCH_WINDOW", "0.05"))
+MAX_BATCH = int(config.get("NEXA_DISPATCH_MAX_BATCH", "8"))
+
+
+class _Request:
+    # future resolves to (results, cacheable), as match_engine.match_with_status returns
+    __slots__ = ("sme_text", "top_k", "mode", "filters", "future")
+
+    def __init__(self, sme_text, top_k, mode, filters):
+        self.sme_text = sme_text
+        self.top_k = top_k
+        self.mode = mode
+        self.filters = filters
+        self.future = Future()
+
+
+class MatchDispatcher:
+    def __init__(self, window: float = BATCH_WINDOW, max_batch: int = MAX_BATCH):
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._queue = []
+        self._timer = None
+        self._pool = ThreadPoolExecutor(max_workers=max(2, self.max_batch), thread_name_prefix="match-dispatch")
+
+    def find_best_matches(self, sme_text: str, top_k: int = None, mode: str = None, filters=None):
+        mode = mode or match_engine.MATCH_MODE
+        if mode not in match_engine.MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{mode}'. Use one of {match_engine.MATCH_MODES}.")
+        filters = expert_filters.normalize(filters)
+        if mode == "local" or not llm_client.is_available():
+            return match_engine.find_best_matches(sme_text, top_k, mode=mode, filters=filters)
+
+        key, flight, leader = self._join(sme_text, top_k, mode, filters)
+        if not leader:
+            try:
+                return self._wait(flight, mode)
+            except _Abandoned:
+                return self.find_best_matches(sme_text, top_k, mode, filters)
+
+        try:
+            flight.set_result(self._lead(sme_text, top_k, mode, filters))
+        except Exception as e:
+            flight.set_exception(e)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+        return _copy(flight.result())
+
+    def stream_best_matches(self, sme_text: str, top_k: int = None, mode: str = None, filters=None):
+        """
+        Generator form (see match_engine.stream_best_matches). The first caller
+        streams; identical queries arriving meanwhile, streamed or not, wait for
+        its final list instead of making their own LLM call.
+        """
+        mode = mode or match_engine.MATCH_MODE
+        if mode not in match_engine.MATCH_MODES:
+            raise ValueError(f"Unknown match mode '{mode}'. Use one of {match_engine.MATCH_MODES}.")
+        filters = expert_filters.normalize(filters)
+        if mode == "local" or not llm_client.is_available():
+            yield from match_engine.stream_best_matches(sme_text, top_k, mode=mode, filters=filters)
+            return
+
+        key, flight, leader = self._join(sme_text, top_k, mode, filters)
+        if not leader:
+            try:
+                results = self._wait(flight, mode)
+            except _Abandoned:
+                results = self.find_best_matches(sme_text, top_k, mode, filters)
+            yield from results
+            return
+
+        results = []
+        try:
+            for match in match_engine.stream_best_matches(sme_text, top_k, mode=mode, filters=filters):
+                results.append(match)
+                yield dict(match)
+            flight.set_result(results)
+        except GeneratorExit:
+            # The leader's caller stopped reading (e.g. a Streamlit rerun): joiners retry on their own
+            flight.set_exception(_Abandoned())
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    # --- SINGLE-FLIGHT ---
+    def _join(self, sme_text, top_k, mode, filters):
+        """ (key, future, leader): the pending call for this query, created if there is none. """
+        key = (match_cache.normalize_query(sme_text), top_k, mode, json.dumps(filters, sort_keys=True))
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Future()
+        return key, flight, leader
+
+    def _wait(self, flight, mode):
+        with telemetry.trace("find_best_matches", mode=mode, dispatched=True) as t:
+            t.incr("single_flight_join")
+            with t.stage("dispatch_wait"):
+                return _copy(flight.result())
+
+    def _lead(self, sme_text, top_k, mode, filters):
+        """ Runs one distinct query: cache, then a seat in the next batch. """
+        with telemetry.trace("find_best_matches", mode=mode, dispatched=True) as t:
+            key = None
+            if match_cache.cache.enabled:
+                with t.stage("cache_lookup"):
+                    key = match_engine.match_cache_key(sme_text, top_k, mode, filters)
+                    cached = match_cache.cache.get(key)
+                if cached is not None:
+                    t.incr("match_cache_hit")
+                    return cached
+                t.incr("match_cache_miss")
+
+            with t.stage("dispatch_wait"):
+                results, cacheable = self._enqueue(_Request(sme_text, top_k, mode, filters)).result()
+            t.add(results=len(results))
+            # A local-ranker fallback after an LLM failure is served but not cached
+            if key and cacheable:
+                match_cache.cache.set(key, results)
+            return results
+
+    # --- BATCHING ---
+    def _enqueue(self, request: _Request) -> Future:
+        with self._lock:
+            self._queue.append(request)
+            if len(self._queue) >= self.max_batch:
+                batch = self._take()
+            else:
+                batch = None
+                if self._timer is None:
+                    self._timer = threading.Timer(self.window, self._on_timer)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if batch:
+            self._pool.submit(self._run_batch, batch)
+        return request.future
+
+    def _take(self):
+        """ Empties the queue. Caller holds the lock. """
+        batch, self._queue = self._queue, []
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return batch
+
+    def _on_timer(self):
+        with self._lock:
+            batch = self._take()
+        if batch:
+            self._run_batch(batch)
+
+    def _run_batch(self, batch):
+        with telemetry.trace("match_batch", size=len(batch)) as t:
+            ready = []
+            for request in batch:
+                try:
+                    experts = match_engine.load_candidates(request.sme_text, request.top_k, request.filters)
+                except Exception as e:
+                    request.future.set_exception(e)
+                    continue
+                if not experts:
+                    request.future.set_result(([], False))
+                elif match_engine.needs_tournament(experts):
+                    # Too big to share a prompt: the tournament ranks it on its own
+                    self._pool.submit(self._run_alone, request)
+                else:
+                    ready.append((request, experts))
+            if len(ready) == 1:
+                self._run_alone(ready[0][0])
+                return
+            if not ready:
+                return
+
+            t.incr("batched_queries", len(ready))
+            try:
+                with t.stage("model_resolve"):
+                    model = llm_client.get_model()
+                answers = match_engine.rank_many_with_llm(model, [(r.sme_text, experts) for r, experts in ready])
+            except Exception as e:
+                logger.warning("Batched match call failed (%s); ranking %d queries one by one.", e, len(ready))
+                t.incr("llm_error")
+                answers = [None] * len(ready)
+            for (request, _), answer in zip(ready, answers):
+                if answer is None:
+                    self._pool.submit(self._run_alone, request)
+                else:
+                    request.future.set_result((match_engine.mark_ai(answer), True))
+
+    def _run_alone(self, request: _Request):
+        """ Single-query path (with its fallbacks and error cards), bypassing the cache. """
+        try:
+            request.future.set_result(match_engine.match_with_status(
+                request.sme_text, request.top_k, use_cache=False, mode=request.mode, filters=request.filters))
+        except Exception as e:
+            request.future.set_exception(e)
+
+
+class _Abandoned(Exception):
+    """ A streaming leader stopped before finishing; its joiners run the query themselves. """
+
+
+def _copy(results):
+    # Callers share one result list; hand each its own dicts
+    return [dict(r) for r in results]
+
+
+dispatcher = MatchDispatcher()
+
+def find_best_matches(sme_text: str, top_k: int = None, mode: str = None, filters=None):
+    return dispatcher.find_best_matches(sme_text, top_k, mode, filters)
+
+def stream_best_matches(sme_text: str, top_k: int = None, mode: str = None, filters=None):
+    return dispatcher.stream_best_matches(sme_text, top_k, mode, filters)
@@ -1,86 +1,425 @@
-import os
 import json
-from sqlmodel import Session, select, create_engine
-from dotenv import load_dotenv # CRITICAL FIX
-from models import Expert, engine
-import google.generativeai as genai
+import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from sqlmodel import Session, select
+import config
+from models import Expert, read_engine
+import llm_client
+import search_index
+import catalog
+import match_cache
+import vector_index
+import local_ranker
+import expert_filters
+import match_digest
+import json_stream
+import telemetry
 
-# 1. Force load the .env file
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# DEBUG: API Key Check
-print(f"DEBUG: API Key loaded? {bool(os.environ.get('GOOGLE_API_KEY'))}")
+def fuse_rankings(rankings, top_k: int, k: int = 60):
+    """ Reciprocal Rank Fusion of several [(expert_id, score)] lists. """
+    fused = {}
+    for ranking in rankings:
+        for rank, (expert_id, _) in enumerate(ranking):
+            fused[expert_id] = fused.get(expert_id, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:top_k]
 
-def find_best_matches(sme_text: str):
-    """ Hybrid Matcher: Uses Gemini if Key exists, otherwise falls back to keyword matching. """
-    with Session(engine) as session:
-        experts = session.exec(select(Expert)).all()
+# What the ranking prompt needs; the long free-text columns stay in the DB
+CANDIDATE_COLUMNS = (
+    Expert.id, Expert.name, Expert.match_digest, Expert.digest_version,
+    Expert.headline, Expert.domains, Expert.icp_focus,
+)
 
-    if not experts:
-        return []
+def load_candidates(sme_text: str, top_k: int = None, filters=None):
+    """
+    Narrows the catalog to at most top_k experts using the BM25 index
+    (exact terms) fused with the vector index (fuzzy/semantic overlap).
+    Small catalogs are passed through whole so the LLM sees everyone.
+    Structured filters (see expert_filters) are applied before any scoring.
+    """
+    top_k = top_k or search_index.SHORTLIST_K
+    t = telemetry.current()
+    allowed = None
+    if filters:
+        with t.stage("prefilter"):
+            allowed = expert_filters.get_arrays().allowed_ids(filters)
+        t.add(prefiltered=len(allowed))
+        if not len(allowed):
+            return []
+    where = expert_filters.conditions(filters)
 
-    # DEBUG: Prove we are talking to the DB
-    print(f"DEBUG: Found {len(experts)} experts in DB: {[e.name for e in experts]}")
-    
-    api_key = os.environ.get("GOOGLE_API_KEY")
+    total = len(allowed) if allowed is not None else catalog.get_snapshot().count
+    if total <= top_k:
+        with t.stage("db_load"), Session(read_engine) as session:
+            return session.exec(select(*CANDIDATE_COLUMNS).where(*where)).all()
 
-    # --- PATH A: SMART MATCHING (If Key Exists) ---
-    if api_key:
-        try:
-            genai.configure(api_key=api_key)
-            # Auto-discover a valid model
-            available_models = []
-            for m in genai.list_models():
-                if 'generateContent' in m.supported_generation_methods:
-                    available_models.append(m.name)
-            # Prefer 'gemini-1.5' or 'gemini-pro', but take whatever works
-            model_name = next((m for m in available_models if 'gemini-1.5' in m), None)
-            if not model_name:
-                model_name = next((m for m in available_models if 'gemini' in m), available_models[0])
-            print(f"DEBUG: Selected Model: {model_name}")
-            model = genai.GenerativeModel(model_name)
-            
-            experts_context = ""
-            for e in experts:
-                experts_context += f"- Name: {e.name} | Headline: {e.headline} | Skills: {e.domains}\n"
-            
-            system_prompt = f"""
+    with t.stage("retrieval"):
+        search_index.ensure_index()
+        vector_index.ensure_index()
+        ranked = fuse_rankings([
+            search_index.search(sme_text, top_k, None if allowed is None else set(allowed.tolist())),
+            vector_index.search(sme_text, top_k, allowed),
+        ], top_k)
+
+    with t.stage("db_load"), Session(read_engine) as session:
+        if not ranked:
+            # Nothing matched lexically: hand the LLM the strongest profiles instead
+            return session.exec(
+                select(*CANDIDATE_COLUMNS).where(*where).order_by(Expert.confidence_score.desc()).limit(top_k)
+            ).all()
+        ids = [expert_id for expert_id, _ in ranked]
+        by_id = {e.id: e for e in session.exec(select(*CANDIDATE_COLUMNS).where(Expert.id.in_(ids))).all()}
+    return [by_id[i] for i in ids if i in by_id]
+
+AI_ERROR_NAME = "⚠️ AI CRASHED"
+
+# --- TOURNAMENT SETTINGS ---
+# Shortlists that do not fit one prompt (more than CHUNK experts, or more than
+# the prompt token budget) are ranked map-reduce style: each chunk picks its
+# FANOUT best in parallel, then the winners are reranked together.
+TOURNAMENT_CHUNK = int(config.get("NEXA_TOURNAMENT_CHUNK", "60"))
+TOURNAMENT_FANOUT = int(config.get("NEXA_TOURNAMENT_FANOUT", "3"))
+TOURNAMENT_CONCURRENCY = int(config.get("NEXA_TOURNAMENT_CONCURRENCY", "4"))
+
+def needs_tournament(experts) -> bool:
+    """ True when one prompt cannot show every candidate. """
+    return len(experts) > TOURNAMENT_CHUNK or not match_digest.fits_budget(experts)
+
+def build_match_prompt(sme_text: str, experts, top_n: int = 3, token_budget: int = None) -> str:
+    """ Candidates are listed best-first as precomputed digests, up to the token budget. """
+    lines, dropped = match_digest.candidate_lines(experts, token_budget or match_digest.PROMPT_TOKEN_BUDGET)
+    if dropped:
+        telemetry.current().incr("prompt_candidates_dropped", dropped)
+    experts_context = "\n".join(lines)
+
+    return f"""
             Act as a Matchmaker.
             SME PROBLEM: "{sme_text}"
             CANDIDATES:
             {experts_context}
-            TASK: Pick the top 3 experts. Return JSON ONLY.
+            TASK: Pick the top {top_n} experts. Return JSON ONLY.
             [ {{ "expert_name": "Name", "score": 90, "reason": "Why..." }} ]
             """
+
+def rank_with_llm(model, sme_text: str, experts, top_n: int = 3):
+    """ Single-shot ranking: one prompt with every candidate. """
+    t = telemetry.current()
+    with t.stage("prompt_build"):
+        prompt = build_match_prompt(sme_text, experts, top_n)
+    with t.stage("llm_call"):
+        response = model.generate_content(prompt)
+    telemetry.record_llm_usage(prompt, response)
+    with t.stage("json_parse"):
+        cleaned = response.text.strip().replace('```json', '').replace('```', '')
+        return json.loads(cleaned)[:top_n]
+
+def build_multi_match_prompt(items, top_n: int = 3) -> str:
+    """
+    One prompt for several independent queries (see match_dispatcher).
+    items: [(sme_text, experts)]; each query only sees its own candidates.
+    """
+    # Each problem gets the same candidate budget as a single-query prompt
+    blocks = []
+    for i, (sme_text, experts) in enumerate(items, start=1):
+        lines, dropped = match_digest.candidate_lines(experts)
+        if dropped:
+            telemetry.current().incr("prompt_candidates_dropped", dropped)
+        candidates = "\n".join(lines)
+        blocks.append(f'PROBLEM {i}:\nSME PROBLEM: "{sme_text}"\nCANDIDATES:\n{candidates}')
+    problems = "\n\n".join(blocks)
+
+    return f"""
+            Act as a Matchmaker for {len(items)} independent SME problems.
+            For each PROBLEM pick the top {top_n} experts from that problem's own CANDIDATES only.
+{problems}
+
+            TASK: Return JSON ONLY, one list per problem number:
+            {{ "1": [ {{ "expert_name": "Name", "score": 90, "reason": "Why..." }} ], "2": [ ... ] }}
+            """
+
+def rank_many_with_llm(model, items, top_n: int = 3):
+    """
+    Ranks several queries with one LLM call. Returns one result list per item,
+    or None for an item the answer left out or filled with unknown names.
+    """
+    t = telemetry.current()
+    with t.stage("prompt_build"):
+        prompt = build_multi_match_prompt(items, top_n)
+    with t.stage("llm_call"):
+        response = model.generate_content(prompt)
+    telemetry.record_llm_usage(prompt, response)
+    with t.stage("json_parse"):
+        cleaned = response.text.strip().replace('```json', '').replace('```', '')
+        answer = json.loads(cleaned)
+    out = []
+    for i, (_, experts) in enumerate(items, start=1):
+        names = {e.name for e in experts}
+        picks = [r for r in answer.get(str(i)) or [] if r.get("expert_name") in names]
+        out.append(picks[:top_n] or None)
+    return out
+
+def stream_rank_with_llm(model, sme_text: str, experts, top_n: int = 3):
+    """
+    rank_with_llm over a streamed response: yields each match dict as soon as
+    its closing brace arrives instead of after the whole answer.
+    """
+    t = telemetry.current()
+    with t.stage("prompt_build"):
+        prompt = build_match_prompt(sme_text, experts, top_n)
+    with t.stage("llm_call"):
+        response = model.generate_content(prompt, stream=True)
+    parser = json_stream.ArrayItemParser()
+    sent = 0
+    text = []
+    for chunk in response:
+        text.append(chunk.text)
+        for item in parser.feed(chunk.text):
+            yield item
+            sent += 1
+            if sent >= top_n:
+                break
+        if sent >= top_n or parser.done:
+            break
+    if not sent:
+        # Nothing streamed: parse the whole answer the way rank_with_llm does
+        with t.stage("json_parse"):
+            cleaned = "".join(text).strip().replace('```json', '').replace('```', '')
+            items = json.loads(cleaned)[:top_n]
+        if not items:
+            raise json.JSONDecodeError("No match objects in streamed answer", cleaned, 0)
+        yield from items
+    telemetry.record_llm_usage(prompt, response)
+
+def mark_ai(results):
+    for r in results:
+        r["reason"] = f"⚡ [AI MATCH]: {r.get('reason', '')}"
+    return results
+
+def tournament_rank(model, sme_text: str, experts, top_n: int = 3,
+                    chunk_size: int = None, fan_out: int = None, concurrency: int = None):
+    """
+    Map-reduce ranking for candidate lists that do not fit one prompt.
+    Chunks are ranked in parallel (wall clock ~ slowest chunk); the winners of
+    each round are reranked until they fit one final prompt.
+    """
+    finalists = tournament_finalists(model, sme_text, experts, chunk_size, fan_out, concurrency)
+    return rank_with_llm(model, sme_text, finalists, top_n)
+
+def tournament_finalists(model, sme_text: str, experts,
+                         chunk_size: int = None, fan_out: int = None, concurrency: int = None):
+    """
+    The rounds of tournament_rank: narrows experts until they fit one prompt.
+    Chunks are cut by the prompt token budget as well as by chunk_size, so
+    every candidate is shown to the model in some round.
+    """
+    chunk_size = chunk_size or TOURNAMENT_CHUNK
+    fan_out = fan_out or TOURNAMENT_FANOUT
+    concurrency = concurrency or TOURNAMENT_CONCURRENCY
+
+    while True:
+        chunks = match_digest.budget_chunks(experts, max_size=chunk_size)
+        if len(chunks) == 1:
+            break
+        # Each round must shrink the field, or we would loop forever
+        fan_out = max(1, min(fan_out, max(len(c) for c in chunks) // 2))
+        by_name = {e.name: e for e in experts}
+        winners, errors = [], []
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks))) as pool:
+            # copy_context() carries the active telemetry trace into the workers
+            futures = [
+                pool.submit(contextvars.copy_context().run, rank_with_llm, model, sme_text, chunk, fan_out)
+                for chunk in chunks
+            ]
+            for future in futures:
+                try:
+                    picks = future.result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                winners += [by_name[p["expert_name"]] for p in picks if p.get("expert_name") in by_name]
+        if not winners:
+            # Every chunk failed: surface the first error to the caller
+            raise errors[0] if errors else ValueError("Tournament produced no winners")
+        # Dedupe while keeping order (a name could be picked twice by a sloppy answer)
+        winners = list({e.name: e for e in winners}.values())
+        if len(winners) >= len(experts):
+            # Only possible with one-expert chunks (digests near the whole budget)
+            break
+        experts = winners
+        logger.debug("Tournament round: %d chunks -> %d finalists", len(chunks), len(experts))
+        telemetry.current().incr("tournament_rounds")
+
+    return experts
+
+# "llm": Gemini only, "local": offline ranker only,
+# "hybrid": Gemini when available, local ranker when not (or when it fails)
+MATCH_MODES = ("hybrid", "llm", "local")
+MATCH_MODE = config.get("NEXA_MATCH_MODE", "hybrid")
+
+def match_cache_key(sme_text: str, top_k: int, mode: str, filters) -> str:
+    """ Cache key for one query; embeds the catalog version, so writes invalidate it. """
+    return match_cache.make_key(sme_text, catalog.get_catalog_version(), top_k or search_index.SHORTLIST_K, mode,
+                                json.dumps(filters, sort_keys=True))
+
+def is_cacheable(results) -> bool:
+    # Never cache empty answers or error cards; those should be retried
+    return bool(results) and not any(r.get("expert_name") == AI_ERROR_NAME for r in results)
+
+def find_best_matches(sme_text: str, top_k: int = None, use_cache: bool = True, mode: str = None, filters=None):
+    """
+    Cached front for the matcher. Results are keyed on the normalized query and
+    the catalog version, so any expert write invalidates them.
+    filters: optional dict of structured constraints (rate range, minimum
+    confidence, icp, strength-mix thresholds; see expert_filters.FILTER_KEYS).
+    """
+    return match_with_status(sme_text, top_k, use_cache, mode, filters)[0]
+
+def match_with_status(sme_text: str, top_k: int = None, use_cache: bool = True, mode: str = None, filters=None):
+    """
+    find_best_matches, also returning whether the answer may be cached:
+    (results, cacheable). Local-ranker fallbacks after an LLM failure and
+    error cards are not, so the next request retries the model.
+    """
+    mode = mode or MATCH_MODE
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode '{mode}'. Use one of {MATCH_MODES}.")
+    filters = expert_filters.normalize(filters)
+
+    with telemetry.trace("find_best_matches", mode=mode) as t:
+        if filters:
+            t.add(filters=filters)
+        key = None
+        if use_cache and match_cache.cache.enabled:
+            with t.stage("cache_lookup"):
+                key = match_cache_key(sme_text, top_k, mode, filters)
+                cached = match_cache.cache.get(key)
+            if cached is not None:
+                t.incr("match_cache_hit")
+                return cached, True
+            t.incr("match_cache_miss")
+
+        results, answered = _find_best_matches(sme_text, top_k, mode, filters)
+        t.add(results=len(results))
+
+        cacheable = answered and is_cacheable(results)
+        if key and cacheable:
+            match_cache.cache.set(key, results)
+        return results, cacheable
+
+def _find_best_matches(sme_text: str, top_k: int = None, mode: str = "hybrid", filters=None):
+    """
+    Hybrid Matcher: Uses Gemini if Key exists, otherwise falls back to the local ranker.
+    Returns (results, answered); answered is False when the LLM failed and the
+    results are a fallback or an error card.
+    """
+    # --- PATH B: LOCAL RANKER (Explicit, or hybrid without a key) ---
+    t = telemetry.current()
+    if mode == "local" or (mode == "hybrid" and not llm_client.is_available()):
+        with t.stage("local_rank"):
+            return local_ranker.rank(sme_text, filters=filters), True
+
+    experts = load_candidates(sme_text, top_k, filters)
+
+    if not experts:
+        return [], True
+
+    t.add(candidates=len(experts))
+    
+    # --- PATH A: SMART MATCHING (If Key Exists) ---
+    if llm_client.is_available():
+        try:
+            # Configured client + discovered model are cached process-wide
+            with t.stage("model_resolve"):
+                model = llm_client.get_model()
             
-            response = model.generate_content(system_prompt)
-            cleaned = response.text.strip().replace('```json', '').replace('```', '')
-            results = json.loads(cleaned)
+            if needs_tournament(experts):
+                results = tournament_rank(model, sme_text, experts)
+            else:
+                results = rank_with_llm(model, sme_text, experts)
             
-            # Add Prefix
-            for r in results:
-                r["reason"] = f"⚡ [AI MATCH]: {r.get('reason', '')}"
-                
-            return results
+            return mark_ai(results), True
             
         except Exception as e:
-            # print(f"⚠️ AI Failed ({e}). Falling back to keywords.")
+            # Re-discover next time if the cached model was retired
+            if llm_client.is_model_not_found(e):
+                llm_client.invalidate()
+            t.incr("llm_error")
+            if mode == "hybrid":
+                logger.warning("⚠️ AI Failed (%s). Falling back to local ranker.", e)
+                with t.stage("local_rank"):
+                    return local_ranker.rank(sme_text, filters=filters), False
             # ERROR MODE: Return specific error card
             return [{
-                "expert_name": "⚠️ AI CRASHED",
+                "expert_name": AI_ERROR_NAME,
                 "score": 0,
                 "reason": str(e)
-            }]
+            }], False
 
-    # --- PATH B: DUMB FALLBACK (If No Key or AI Fails) ---
-    # Disabled for debugging
-    return []
-    
+    # "llm" mode without a key
+    return [], True
+
+def stream_best_matches(sme_text: str, top_k: int = None, use_cache: bool = True, mode: str = None, filters=None):
     """
-    print("⚠️ Using Keyword Fallback")
-    matches = []
-    search_terms = sme_text.lower().split()
-    
-    for e in experts:
-    ...
+    Generator form of find_best_matches for progressive rendering: yields the
+    same {expert_name, score, reason} dicts, each as soon as the model has
+    finished writing it. Cache hits, the local ranker and fallbacks yield
+    their (already complete) results at once.
     """
+    mode = mode or MATCH_MODE
+    if mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match mode '{mode}'. Use one of {MATCH_MODES}.")
+    filters = expert_filters.normalize(filters)
+    if mode == "local" or not llm_client.is_available():
+        yield from find_best_matches(sme_text, top_k, use_cache, mode, filters)
+        return
+
+    with telemetry.trace("find_best_matches", mode=mode, streamed=True) as t:
+        key = None
+        if use_cache and match_cache.cache.enabled:
+            with t.stage("cache_lookup"):
+                key = match_cache_key(sme_text, top_k, mode, filters)
+                cached = match_cache.cache.get(key)
+            if cached is not None:
+                t.incr("match_cache_hit")
+                yield from cached
+                return
+            t.incr("match_cache_miss")
+
+        experts = load_candidates(sme_text, top_k, filters)
+        if not experts:
+            return
+        t.add(candidates=len(experts))
+
+        results = []
+        try:
+            with t.stage("model_resolve"):
+                model = llm_client.get_model()
+            if needs_tournament(experts):
+                # Early rounds must finish before the final ranking can stream
+                experts = tournament_finalists(model, sme_text, experts)
+            for match in stream_rank_with_llm(model, sme_text, experts):
+                if not results:
+                    t.add(first_result_ms=round(t.elapsed_ms(), 2))
+                results.append(mark_ai([match])[0])
+                yield results[-1]
+        except Exception as e:
+            if llm_client.is_model_not_found(e):
+                llm_client.invalidate()
+            t.incr("llm_error")
+            if results:
+                # Keep what was already shown; just do not cache a partial answer
+                logger.warning("⚠️ Match stream broke after %d results (%s).", len(results), e)
+                return
+            if mode == "hybrid":
+                logger.warning("⚠️ AI Failed (%s). Falling back to local ranker.", e)
+                with t.stage("local_rank"):
+                    yield from local_ranker.rank(sme_text, filters=filters)
+                return
+            yield {"expert_name": AI_ERROR_NAME, "score": 0, "reason": str(e)}
+            return
+
+        t.add(results=len(results))
+        if key and is_cacheable(results):
+            match_cache.cache.set(key, results)
@@ -1,20 +1,79 @@
 from typing import List, Optional, Dict
 from sqlmodel import Field, SQLModel, create_engine
-from sqlalchemy import Column
+from sqlalchemy import Column, event
 from sqlalchemy.types import JSON
 import json
+import os
+import logging
+import config
 
-# Database setup
-sqlite_file_name = "nexa.db"
+logger = logging.getLogger(__name__)
+
+# Database setup (NEXA_DB_PATH lets benchmarks and tests use a scratch DB)
+sqlite_file_name = config.get("NEXA_DB_PATH", "nexa.db")
 sqlite_url = f"sqlite:///{sqlite_file_name}"
-engine = create_engine(sqlite_url)
+# Side database for caches, next to the main DB (safe to delete at any time)
+cache_file_name = os.path.join(os.path.dirname(sqlite_file_name), "nexa_cache.db")
+
+# --- ENGINE SETTINGS ---
+# WAL lets readers run while one writer commits; busy_timeout makes writers
+# queue instead of failing with "database is locked".
+SQLITE_PRAGMAS = {
+    "journal_mode": config.get("NEXA_SQLITE_JOURNAL_MODE", "WAL"),
+    "busy_timeout": int(config.get("NEXA_SQLITE_BUSY_TIMEOUT_MS", "10000")),
+    # NORMAL is durable across app crashes in WAL mode (only an OS crash can lose the last commit)
+    "synchronous": config.get("NEXA_SQLITE_SYNCHRONOUS", "NORMAL"),
+    "mmap_size": int(config.get("NEXA_SQLITE_MMAP_SIZE", str(256 * 1024 * 1024))),
+    # Negative = KiB, per connection
+    "cache_size": int(config.get("NEXA_SQLITE_CACHE_SIZE", "-65536")),
+}
+# One connection per concurrently active thread (Streamlit sessions, workers, pools)
+POOL_SIZE = int(config.get("NEXA_SQLITE_POOL_SIZE", "8"))
+POOL_OVERFLOW = int(config.get("NEXA_SQLITE_POOL_OVERFLOW", "16"))
+
+def apply_pragmas(dbapi_conn, read_only: bool = False, pragmas: dict = None):
+    """ Runs the connection pragmas on a raw sqlite3 connection. """
+    cursor = dbapi_conn.cursor()
+    try:
+        for name, value in (pragmas or SQLITE_PRAGMAS).items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        if read_only:
+            cursor.execute("PRAGMA query_only = ON")
+    finally:
+        cursor.close()
+
+def make_engine(path: str = None, read_only: bool = False, pool_size: int = None, **pragmas):
+    """
+    SQLite engine with the pragmas above (keyword overrides per engine) and a
+    thread-shared connection pool. read_only=True rejects writes on every
+    connection, for query paths that must never take the write lock.
+    """
+    path = path or sqlite_file_name
+    settings = {**SQLITE_PRAGMAS, **pragmas}
+    new_engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False, "timeout": settings["busy_timeout"] / 1000},
+        pool_size=pool_size or POOL_SIZE,
+        max_overflow=POOL_OVERFLOW,
+    )
+
+    @event.listens_for(new_engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        apply_pragmas(dbapi_conn, read_only, settings)
+
+    return new_engine
+
+engine = make_engine()
+# Matching and catalog reads go through here (WAL readers never block the writer)
+read_engine = make_engine(read_only=True)
 
 class Expert(SQLModel, table=True):
     __table_args__ = {'extend_existing': True}
     id: Optional[int] = Field(default=None, primary_key=True)
-    name: str
+    # Natural key for upserts (see ingest_expert.save_experts)
+    name: str = Field(index=True, unique=True)
     headline: str
-    rate: float | None = None
+    rate: float | None = Field(default=None, index=True)
     links: List[str] = Field(default=[], sa_column=Column(JSON))
     
     # AI-derived fields
@@ -22,9 +81,20 @@ class Expert(SQLModel, table=True):
     domains: List[str] = Field(default=[], sa_column=Column(JSON))
     icp_focus: str
     strength_mix: Dict[str, float] = Field(default={}, sa_column=Column(JSON))
-    confidence_score: int = Field(ge=0, le=100)
+    confidence_score: int = Field(ge=0, le=100, index=True)
+    # strength_mix flattened into indexed columns for pre-filtering (see expert_filters.py)
+    strategy_share: float | None = Field(default=None, index=True)
+    execution_share: float | None = Field(default=None, index=True)
     mini_case_response: str
     vetting_summary: str
+    # Compact candidate line for match prompts (see match_digest.py)
+    match_digest: Optional[str] = None
+    digest_version: Optional[int] = None
+
+def strength_shares(strength_mix) -> tuple:
+    """ (strategy, execution) from a strength_mix dict, whatever the key casing. """
+    mix = {str(k).lower(): v for k, v in (strength_mix or {}).items()}
+    return mix.get("strategy"), mix.get("execution")
 
 class SMENeed(SQLModel, table=True):
     __table_args__ = {'extend_existing': True}
@@ -32,3 +102,114 @@ class SMENeed(SQLModel, table=True):
     core_pain: str
     budget_band: str
     desired_outcome: str
+    # open needs are matched by need_matcher; anything else is left alone
+    status: str = Field(default="open", index=True)
+    # set by an expert save that may change this need's LLM matches; cleared by the re-match worker
+    stale: bool = Field(default=False, index=True)
+
+# --- MATERIALIZED MATCHES ---
+# Ranked experts per SMENeed, written by need_matcher (batch + incremental).
+# source: "llm" (batch run through match_engine) or "local" (incremental rescore)
+class SMEMatch(SQLModel, table=True):
+    __table_args__ = {'extend_existing': True}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    need_id: int = Field(index=True)
+    expert_id: int = Field(index=True)
+    rank: int
+    score: int
+    reason: str
+    source: str
+    computed_at: float
+
+# --- CATALOG STATE ---
+# Small key/value table; "catalog_version" is bumped on every catalog write
+# so caches keyed on it go stale automatically (see catalog.py).
+class CatalogState(SQLModel, table=True):
+    __table_args__ = {'extend_existing': True}
+    key: str = Field(primary_key=True)
+    value: int
+
+# --- VETTING QUEUE ---
+# Persistent job table drained by vetting_queue workers.
+# status: queued -> running -> done | failed (running jobs go back to queued on retry)
+class VettingJob(SQLModel, table=True):
+    __table_args__ = {'extend_existing': True}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    name: str
+    bio: str
+    links: List[str] = Field(default=[], sa_column=Column(JSON))
+    status: str = Field(default="queued", index=True)
+    attempts: int = 0
+    error: Optional[str] = None
+    expert_id: Optional[int] = None
+    created_at: float
+    updated_at: float
+
+# --- SEARCH INDEX TABLES ---
+# BM25 bookkeeping maintained by search_index.py (one doc row per expert,
+# one posting row per (term, expert)).
+class IndexDoc(SQLModel, table=True):
+    __table_args__ = {'extend_existing': True}
+    expert_id: int = Field(primary_key=True)
+    length: float
+
+class IndexPosting(SQLModel, table=True):
+    __table_args__ = {'extend_existing': True}
+    term: str = Field(primary_key=True)
+    expert_id: int = Field(primary_key=True, index=True)
+    tf: float
+
+# --- DOMAIN TAGS ---
+# Expert.domains normalized one row per (tag, expert), maintained by
+# expert_tags.py. tag is case-folded (the lookup key); label keeps the
+# spelling first seen, for display.
+class ExpertTag(SQLModel, table=True):
+    __table_args__ = {'extend_existing': True}
+    tag: str = Field(primary_key=True)
+    expert_id: int = Field(primary_key=True, index=True)
+    label: str
+
+def create_db_and_tables():
+    """ Creates any missing tables. Safe to call on every startup. """
+    SQLModel.metadata.create_all(engine)
+    _migrate()
+
+def _migrate():
+    """ In-place upgrades for databases created before a schema change. """
+    with engine.begin() as conn:
+        indexes = {row[1] for row in conn.exec_driver_sql("PRAGMA index_list(expert)")}
+        if "ix_expert_name" not in indexes:
+            # Older DBs allowed duplicate names: keep the newest row per name
+            stale = "FROM expert WHERE id NOT IN (SELECT MAX(id) FROM expert GROUP BY name)"
+            dropped = conn.exec_driver_sql(f"SELECT name, COUNT(*) {stale} GROUP BY name ORDER BY name").all()
+            if dropped:
+                logger.warning(
+                    "Removing %d older duplicate expert rows before adding the unique name index: %s",
+                    sum(n for _, n in dropped), ", ".join(f"{name} (x{n})" for name, n in dropped),
+                )
+                conn.exec_driver_sql(f"DELETE {stale}")
+            conn.exec_driver_sql("CREATE UNIQUE INDEX ix_expert_name ON expert (name)")
+
+        expert_columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(expert)")}
+        for share in ("strategy", "execution"):
+            column = f"{share}_share"
+            if column not in expert_columns:
+                conn.exec_driver_sql(f"ALTER TABLE expert ADD COLUMN {column} FLOAT")
+                conn.exec_driver_sql(
+                    f"UPDATE expert SET {column} = COALESCE(json_extract(strength_mix, '$.{share}'), "
+                    f"json_extract(strength_mix, '$.{share.capitalize()}'))"
+                )
+        for column, ddl in (("match_digest", "VARCHAR"), ("digest_version", "INTEGER")):
+            if column not in expert_columns:
+                conn.exec_driver_sql(f"ALTER TABLE expert ADD COLUMN {column} {ddl}")
+        for column in ("rate", "confidence_score", "strategy_share", "execution_share"):
+            if f"ix_expert_{column}" not in indexes:
+                conn.exec_driver_sql(f"CREATE INDEX IF NOT EXISTS ix_expert_{column} ON expert ({column})")
+
+        need_columns = {row[1] for row in conn.exec_driver_sql("PRAGMA table_info(smeneed)")}
+        if "status" not in need_columns:
+            conn.exec_driver_sql("ALTER TABLE smeneed ADD COLUMN status VARCHAR NOT NULL DEFAULT 'open'")
+            conn.exec_driver_sql("CREATE INDEX ix_smeneed_status ON smeneed (status)")
+        if "stale" not in need_columns:
+            conn.exec_driver_sql("ALTER TABLE smeneed ADD COLUMN stale BOOLEAN NOT NULL DEFAULT 0")
+            conn.exec_driver_sql("CREATE INDEX ix_smeneed_stale ON smeneed (stale)")
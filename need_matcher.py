@@ -0,0 +1,317 @@
+"""
+Materialized matches for stored SME needs.
+
+Demand-side pages read SMEMatch rows instead of calling the LLM per page load:
+
+    match_open_needs()          # batch: every open SMENeed, parallel workers
+    rescore_experts(experts)    # incremental: called by ingest_expert after a save
+    rematch_stale()             # LLM re-match of needs the incremental path marked stale
+    get_matches([need_id, ...]) # read path
+
+The batch run goes through match_engine.find_best_matches (so it honours the
+match mode and caches), with each need's budget band as a rate filter. The
+incremental path only looks at experts whose match-relevant fields changed,
+and rescores a need with the scorer that produced its stored list (local and
+LLM scores are not on one scale): local lists are merged in place, LLM lists
+are marked stale and re-matched by a background thread (start_worker), so a
+save never waits on the LLM and never re-runs every need.
+
+    python need_matcher.py --workers 4 --mode hybrid
+    python need_matcher.py --stale
+"""
+import json
+import time
+import logging
+import argparse
+import threading
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from sqlmodel import Session, select
+from sqlalchemy import delete, insert, update
+import config
+from models import Expert, SMENeed, SMEMatch, engine, read_engine, create_db_and_tables
+import match_engine
+import local_ranker
+import expert_filters
+import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Matches kept per need
+TOP_N = int(config.get("NEXA_NEED_MATCHES", "3"))
+WORKERS = int(config.get("NEXA_NEED_WORKERS", "4"))
+
+# Expert fields each scorer reads (the LLM sees the prompt digest), and the
+# ones need filters test. A save that changes none of them leaves stored matches valid.
+LLM_FIELDS = ("headline", "domains", "icp_focus", "match_digest")
+LOCAL_FIELDS = tuple(c.key for c in local_ranker.RANKER_COLUMNS if c.key not in ("id", "name"))
+FILTER_FIELDS = ("rate", "confidence_score", "strategy_share", "execution_share", "icp_focus")
+MATCH_FIELDS = tuple(dict.fromkeys(LLM_FIELDS + LOCAL_FIELDS + FILTER_FIELDS))
+
+
+def need_query(need) -> str:
+    """ The free-text query a need is matched with. """
+    return f"{need.core_pain}. Desired outcome: {need.desired_outcome}. Budget: {need.budget_band}"
+
+
+def open_needs(session: Session):
+    return session.exec(select(SMENeed).where(SMENeed.status == "open").order_by(SMENeed.id)).all()
+
+
+def _write_matches(session: Session, need_id: int, matches, now: float):
+    """ Replaces the stored matches of one need. matches: [{expert_id, score, reason, source}] best first. """
+    session.execute(delete(SMEMatch).where(SMEMatch.need_id == need_id), execution_options={"synchronize_session": False})
+    if matches:
+        session.execute(insert(SMEMatch), [
+            {"need_id": need_id, "expert_id": m["expert_id"], "rank": rank, "score": m["score"],
+             "reason": m["reason"], "source": m["source"], "computed_at": now}
+            for rank, m in enumerate(matches, start=1)
+        ])
+
+
+def match_fields(session: Session, names) -> dict:
+    """ {expert_id: {field: value}} of MATCH_FIELDS for the named experts that exist (read before a save). """
+    names = list(names)
+    out = {}
+    for i in range(0, len(names), 500):
+        stmt = select(Expert.id, *[getattr(Expert, f) for f in MATCH_FIELDS]).where(Expert.name.in_(names[i:i + 500]))
+        for row in session.exec(stmt):
+            out[row[0]] = dict(zip(MATCH_FIELDS, row[1:]))
+    return out
+
+
+def _changed(expert, before, fields) -> bool:
+    return before is None or any(getattr(expert, f) != before[f] for f in fields)
+
+
+# --- BATCH ---
+def match_open_needs(workers: int = None, mode: str = None, top_n: int = TOP_N) -> dict:
+    """
+    Matches every open need against the catalog and rewrites its SMEMatch rows.
+    A need whose matching fails keeps its previous rows.
+    """
+    with Session(engine) as session:
+        needs = [(n.id, need_query(n), expert_filters.need_filters(n)) for n in open_needs(session)]
+    return _match_needs(needs, workers, mode, top_n)
+
+
+def _match_needs(needs, workers: int = None, mode: str = None, top_n: int = TOP_N, errors: list = None) -> dict:
+    """
+    needs: [(need_id, query, filters)]. Matches each through match_engine and stores the result.
+    errors: if given, collects the ids of needs whose matching raised or returned an error card.
+    """
+    stats = {"needs": len(needs), "matched": 0, "failed": 0}
+    if not needs:
+        return stats
+
+    def run(query, filters):
+        return match_engine.find_best_matches(query, mode=mode, filters=filters)[:top_n]
+
+    with telemetry.trace("match_needs", needs=len(needs)) as t, \
+            ThreadPoolExecutor(max_workers=workers or WORKERS) as pool:
+        futures = {
+            pool.submit(contextvars.copy_context().run, run, query, filters): need_id
+            for need_id, query, filters in needs
+        }
+        with Session(engine) as session:
+            for future in as_completed(futures):
+                need_id = futures[future]
+                try:
+                    results = future.result()
+                except Exception:
+                    logger.exception("Matching need %s failed", need_id)
+                    results = None
+                if not results or results[0]["expert_name"] == match_engine.AI_ERROR_NAME:
+                    stats["failed"] += 1
+                    if errors is not None and (results is None or results):
+                        errors.append(need_id)
+                    continue
+
+                with t.stage("db_write"):
+                    names = [r["expert_name"] for r in results]
+                    ids = dict(session.exec(select(Expert.name, Expert.id).where(Expert.name.in_(names))).all())
+                    matches = [
+                        {"expert_id": ids[r["expert_name"]], "score": int(r.get("score") or 0),
+                         "reason": r.get("reason", ""), "source": "local" if "[LOCAL MATCH]" in r.get("reason", "") else "llm"}
+                        for r in results if r["expert_name"] in ids
+                    ]
+                    _write_matches(session, need_id, matches, time.time())
+                    session.commit()
+                stats["matched"] += 1
+        t.add(**stats)
+    return stats
+
+
+# --- INCREMENTAL ---
+def rescore_experts(experts, previous=None, top_n: int = TOP_N) -> int:
+    """
+    Brings stored matches up to date after experts were saved. Runs on the
+    save path, so it never calls the LLM.
+    previous: match_fields() read before the save; experts whose match fields
+    did not change are skipped (without it, every expert counts as changed).
+
+    Local and LLM scores are not comparable, so each need keeps its scorer:
+      - local lists: changed experts are scored with the local ranker and merged in
+      - LLM lists: the need is marked stale when a listed expert's digest changed
+        or it no longer passes the need's filters, or when a changed expert
+        (new ones included) is relevant to the need and passes them; the
+        re-match worker (rematch_stale) then re-ranks it with the LLM
+    Returns the number of needs whose matches changed or were marked stale.
+    """
+    previous = previous or {}
+    experts = [e for e in experts if _changed(e, previous.get(e.id), MATCH_FIELDS)]
+    if not experts:
+        return 0
+    with Session(engine) as session:
+        needs = open_needs(session)
+        if not needs:
+            return 0
+        need_ids = [n.id for n in needs]
+        stored = {}
+        for m in session.exec(select(SMEMatch).where(SMEMatch.need_id.in_(need_ids)).order_by(SMEMatch.rank)):
+            stored.setdefault(m.need_id, []).append(
+                {"expert_id": m.expert_id, "score": m.score, "reason": m.reason, "source": m.source})
+
+        # A possibly stale ranker is fine here: it only supplies IDF statistics
+        ranker = local_ranker.get_ranker(allow_stale=True)
+        rows = [tuple(getattr(e, c.key) for c in local_ranker.RANKER_COLUMNS) for e in experts]
+        local_changed = [_changed(e, previous.get(e.id), LOCAL_FIELDS + FILTER_FIELDS) for e in experts]
+        llm_changed = [_changed(e, previous.get(e.id), LLM_FIELDS + FILTER_FIELDS) for e in experts]
+        now, touched, stale = time.time(), 0, []
+        for need in needs:
+            filters = expert_filters.need_filters(need)
+            current = stored.get(need.id, [])
+            listed = {m["expert_id"] for m in current}
+            passes = [expert_filters.passes(e, filters) for e in experts]
+            scores = ranker.score_rows(need_query(need), rows)
+
+            if any(m["source"] == "llm" for m in current):
+                if not need.stale and any(
+                    (e.id in listed and (_changed(e, previous.get(e.id), LLM_FIELDS) or not ok))
+                    or (e.id not in listed and changed and ok and score > 0)
+                    for e, changed, ok, score in zip(experts, llm_changed, passes, scores)
+                ):
+                    stale.append(need.id)
+                continue
+
+            changed_ids = {e.id for e, changed in zip(experts, local_changed) if changed}
+            scores = [score if ok and changed else 0 for score, ok, changed in zip(scores, passes, local_changed)]
+            if not any(scores) and not (listed & changed_ids):
+                continue
+            merged = [m for m in current if m["expert_id"] not in changed_ids]
+            merged += [
+                {"expert_id": e.id, "score": score, "source": "local",
+                 "reason": f"🧭 [LOCAL MATCH]: Rescored after profile update · confidence {e.confidence_score}"}
+                for e, score in zip(experts, scores) if score > 0
+            ]
+            merged = sorted(merged, key=lambda m: -m["score"])[:top_n]
+            if merged != current:
+                _write_matches(session, need.id, merged, now)
+                touched += 1
+        if stale:
+            _set_stale(session, stale, True)
+        session.commit()
+    if stale:
+        _wakeup.set()
+    return touched + len(stale)
+
+
+def _set_stale(session: Session, need_ids, stale: bool):
+    for i in range(0, len(need_ids), 500):
+        session.execute(
+            update(SMENeed).where(SMENeed.id.in_(need_ids[i:i + 500])).values(stale=stale),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def rematch_stale(workers: int = None, mode: str = None, top_n: int = TOP_N) -> dict:
+    """
+    Re-matches every open need marked stale by rescore_experts. The flag is
+    cleared before matching, so a save landing meanwhile marks the need again;
+    needs whose matching errors are marked again for the next pass.
+    """
+    with Session(engine) as session:
+        needs = session.exec(
+            select(SMENeed).where(SMENeed.status == "open", SMENeed.stale == True).order_by(SMENeed.id)  # noqa: E712
+        ).all()
+        jobs = [(n.id, need_query(n), expert_filters.need_filters(n)) for n in needs]
+        if jobs:
+            _set_stale(session, [n.id for n in needs], False)
+            session.commit()
+    errors = []
+    stats = _match_needs(jobs, workers, mode, top_n, errors)
+    if errors:
+        with Session(engine) as session:
+            _set_stale(session, errors, True)
+            session.commit()
+    return stats
+
+
+# --- RE-MATCH WORKER ---
+# Stale needs are re-matched by one background thread, off the save path:
+# woken right after a save marks needs stale, and every REMATCH_INTERVAL
+# seconds to retry needs whose last attempt failed.
+REMATCH_INTERVAL = float(config.get("NEXA_NEED_REMATCH_INTERVAL", "30"))
+_wakeup = threading.Event()
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _worker_loop(stop: threading.Event, interval: float):
+    while not stop.is_set():
+        try:
+            stats = rematch_stale()
+            if stats["needs"]:
+                logger.info("Re-matched stale needs: %s", stats)
+        except Exception:
+            logger.exception("Re-matching stale needs failed")
+        _wakeup.wait(interval)
+        _wakeup.clear()
+
+
+def start_worker(interval: float = REMATCH_INTERVAL) -> threading.Event:
+    """ Starts the re-match thread once per process (idempotent). Returns the stop event. """
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            stop = threading.Event()
+            thread = threading.Thread(target=_worker_loop, args=(stop, interval), name="need-rematch", daemon=True)
+            thread.start()
+            _worker = (thread, stop)
+        return _worker[1]
+
+
+# --- READ PATH ---
+def get_matches(need_ids):
+    """ {need_id: [{expert_id, expert_name, rank, score, reason, source, computed_at}]} """
+    if not need_ids:
+        return {}
+    with Session(read_engine) as session:
+        rows = session.exec(
+            select(SMEMatch, Expert.name)
+            .join(Expert, Expert.id == SMEMatch.expert_id)
+            .where(SMEMatch.need_id.in_(need_ids))
+            .order_by(SMEMatch.need_id, SMEMatch.rank)
+        ).all()
+    out = {i: [] for i in need_ids}
+    for m, name in rows:
+        out[m.need_id].append({
+            "expert_id": m.expert_id, "expert_name": name, "rank": m.rank, "score": m.score,
+            "reason": m.reason, "source": m.source, "computed_at": m.computed_at,
+        })
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Match all open SME needs and store the results.")
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    parser.add_argument("--mode", choices=match_engine.MATCH_MODES, default=None)
+    parser.add_argument("--stale", action="store_true", help="only re-match needs marked stale by expert saves")
+    args = parser.parse_args()
+    create_db_and_tables()
+    run = rematch_stale if args.stale else match_open_needs
+    print(json.dumps(run(args.workers, args.mode)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+import re
+import math
+import heapq
+from collections import Counter, defaultdict
+from sqlmodel import Session, select, func
+from sqlalchemy import delete, insert
+import config
+from models import Expert, IndexDoc, IndexPosting, engine, read_engine
+import catalog
+
+# BM25 parameters (standard Okapi defaults)
+K1 = 1.2
+B = 0.75
+
+# How many candidates survive the shortlist before the LLM sees them
+SHORTLIST_K = int(config.get("NEXA_SHORTLIST_K", "50"))
+
+# Skills and headlines say more about fit than the free-text summary
+FIELD_WEIGHTS = {
+    "name": 1.0,
+    "headline": 2.0,
+    "domains": 2.0,
+    "icp_focus": 1.5,
+    "vetting_summary": 1.0,
+}
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has",
+    "have", "i", "if", "in", "is", "it", "its", "me", "my", "need", "of", "on",
+    "or", "our", "so", "that", "the", "their", "this", "to", "we", "with", "you",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str):
+    """ Lowercases and splits text into index terms, dropping stopwords. """
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def _expert_terms(expert) -> Counter:
+    """ Field-weighted term frequencies for one expert. """
+    tf = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        value = getattr(expert, field, None) or ""
+        if isinstance(value, list):
+            value = " ".join(str(v) for v in value)
+        for term in tokenize(value):
+            tf[term] += weight
+    return tf
+
+
+def index_expert(session: Session, expert):
+    """
+    Replaces the postings of a single expert. The caller owns the transaction,
+    so this can run inside the same commit as the expert write.
+    """
+    index_experts(session, [expert])
+
+
+def index_experts(session: Session, experts):
+    """ Batch form of index_expert: one delete and two executemany inserts. """
+    experts = list(experts)
+    if not experts:
+        return
+    remove_experts(session, [e.id for e in experts])
+    docs, postings = [], []
+    for expert in experts:
+        tf = _expert_terms(expert)
+        docs.append({"expert_id": expert.id, "length": sum(tf.values())})
+        postings.extend({"term": term, "expert_id": expert.id, "tf": freq} for term, freq in tf.items())
+    session.execute(insert(IndexDoc), docs)
+    if postings:
+        session.execute(insert(IndexPosting), postings)
+
+
+def remove_expert(session: Session, expert_id: int):
+    remove_experts(session, [expert_id])
+
+
+def remove_experts(session: Session, expert_ids):
+    # Core-level deletes: the index rows are never loaded as ORM objects
+    for i in range(0, len(expert_ids), 500):
+        chunk = expert_ids[i:i + 500]
+        session.execute(
+            delete(IndexPosting).where(IndexPosting.expert_id.in_(chunk)),
+            execution_options={"synchronize_session": False},
+        )
+        session.execute(
+            delete(IndexDoc).where(IndexDoc.expert_id.in_(chunk)),
+            execution_options={"synchronize_session": False},
+        )
+
+
+def rebuild_index(batch_size: int = 1000):
+    """ Drops and rebuilds the whole index from the Expert table. """
+    with Session(engine) as session:
+        session.execute(delete(IndexPosting))
+        session.execute(delete(IndexDoc))
+        last_id = 0
+        while True:
+            batch = session.exec(
+                select(Expert).where(Expert.id > last_id).order_by(Expert.id).limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            index_experts(session, batch)
+            last_id = batch[-1].id
+        session.commit()
+
+
+_checked_version = None
+
+def ensure_index():
+    """ Rebuilds the index if it has drifted from the Expert table (e.g. after a reset). """
+    global _checked_version
+    snapshot = catalog.get_snapshot()
+    if snapshot.version == _checked_version:
+        return
+    with Session(read_engine) as session:
+        indexed = session.exec(select(func.count()).select_from(IndexDoc)).one()
+    if indexed != snapshot.count:
+        rebuild_index()
+    _checked_version = snapshot.version
+
+
+def search(query: str, top_k: int = SHORTLIST_K, allowed=None):
+    """
+    BM25 search over the persisted index.
+    allowed: optional set of expert ids (pre-filter); others are never returned.
+    Returns a list of (expert_id, score) sorted by descending score.
+    """
+    terms = set(tokenize(query))
+    if not terms:
+        return []
+
+    with Session(read_engine) as session:
+        n_docs, avgdl = session.exec(select(func.count(), func.avg(IndexDoc.length))).one()
+        if not n_docs:
+            return []
+        rows = session.exec(
+            select(IndexPosting.term, IndexPosting.expert_id, IndexPosting.tf, IndexDoc.length)
+            .join(IndexDoc, IndexDoc.expert_id == IndexPosting.expert_id)
+            .where(IndexPosting.term.in_(terms))
+        ).all()
+
+    postings = defaultdict(list)
+    for term, expert_id, tf, length in rows:
+        postings[term].append((expert_id, tf, length))
+
+    avgdl = avgdl or 1.0
+    scores = defaultdict(float)
+    for term, plist in postings.items():
+        df = len(plist)
+        idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+        for expert_id, tf, length in plist:
+            norm = tf + K1 * (1 - B + B * length / avgdl)
+            scores[expert_id] += idf * tf * (K1 + 1) / norm
+
+    items = scores.items() if allowed is None else ((i, s) for i, s in scores.items() if i in allowed)
+    return heapq.nlargest(top_k, items, key=lambda kv: kv[1])
@@ -1,8 +1,16 @@
-from sqlmodel import SQLModel, Session
+import sys
+import random
+from sqlmodel import Session
 from models import Expert, engine
+import models
+import search_index
+import expert_tags
+import match_digest
+import catalog
+import vector_index
 
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    models.create_db_and_tables()
 
 def seed_data():
     experts = [
@@ -71,10 +79,121 @@ def seed_data():
             return
 
         for expert in experts:
+            expert.strategy_share, expert.execution_share = models.strength_shares(expert.strength_mix)
+            expert.match_digest = match_digest.build_digest(expert.headline, expert.domains, expert.icp_focus)
+            expert.digest_version = match_digest.DIGEST_VERSION
             session.add(expert)
+        catalog.bump_catalog_version(session)
         session.commit()
+    search_index.rebuild_index()
+    expert_tags.rebuild_tags()
+    vector_index.rebuild()
     print("Seeding complete: 5 experts added.")
 
+# --- SYNTHETIC CATALOG (benchmarks / load tests) ---
+# Archetypes mirror the hand-written seed experts above; each one expands into
+# many plausible variants so 1k-100k catalogs have realistic term overlap.
+ARCHETYPES = [
+    {
+        "title": "B2B SaaS Growth Strategy",
+        "domains": ["B2B Lead Gen", "SaaS Pricing", "GTM Strategy", "Churn Analytics", "Positioning",
+                    "Product-Led Growth", "Sales Enablement", "Cohort Analysis", "ABM", "Pipeline Forecasting"],
+        "icps": ["Post-PMF SaaS Scale-ups", "Seed-stage SaaS", "Vertical SaaS", "Developer Tools"],
+        "rate": (180, 450), "strategy": (0.6, 0.95),
+        "case": "To fix the leaky bucket, I'd audit {d0} by cohort, then rework {d1} before touching acquisition.",
+    },
+    {
+        "title": "CRM Implementation & Automation",
+        "domains": ["HubSpot", "Salesforce", "CRM Setup", "Email Automation", "Lead Scoring",
+                    "Zapier", "Make.com", "Pipedrive", "Data Migration", "Workflow Design"],
+        "icps": ["Early-stage Solopreneurs / Small Teams", "Agencies", "B2B Services", "Real Estate Teams"],
+        "rate": (60, 160), "strategy": (0.1, 0.4),
+        "case": "I'll set up {d0} with three core workflows and wire {d1} so nothing falls through the cracks in 48 hours.",
+    },
+    {
+        "title": "FinTech Compliance & Risk",
+        "domains": ["FinTech", "Compliance", "Risk Management", "KYC", "AML",
+                    "PCI DSS", "SOC 2", "Lending", "Payments", "Regulatory Reporting"],
+        "icps": ["FinTech Startups (Seed to Series B)", "Neobanks", "Payments Companies", "Crypto Exchanges"],
+        "rate": (150, 400), "strategy": (0.5, 0.8),
+        "case": "For the new product, we need to review the {d0} flow against {d1} and take a risk-based approach.",
+    },
+    {
+        "title": "Performance Marketing",
+        "domains": ["Paid Social", "PPC", "Creative Strategy", "Google Ads", "Meta Ads",
+                    "TikTok Ads", "Conversion API", "Attribution", "UGC", "Landing Page CRO"],
+        "icps": ["E-commerce & D2C Brands", "Mobile Apps", "Local Businesses", "Marketplaces"],
+        "rate": (80, 250), "strategy": (0.3, 0.6),
+        "case": "I'd A/B test five {d0} variations and tighten {d1} to stop wasting spend.",
+    },
+    {
+        "title": "Operational Efficiency & Process Design",
+        "domains": ["Notion", "Zapier", "SOP Creation", "Airtable", "Project Management",
+                    "Client Onboarding", "Knowledge Management", "ClickUp", "Asana", "Hiring Ops"],
+        "icps": ["Agencies & Service Businesses", "Remote Teams", "Consultancies", "Clinics"],
+        "rate": (70, 180), "strategy": (0.4, 0.6),
+        "case": "Knowledge is siloed. I'll build a central wiki in {d0} and automate handoffs with {d1}.",
+    },
+    {
+        "title": "Data & Analytics Engineering",
+        "domains": ["SQL", "dbt", "Looker", "Snowflake", "BigQuery",
+                    "Product Analytics", "Mixpanel", "Amplitude", "Data Modeling", "Dashboards"],
+        "icps": ["Series A-C Startups", "E-commerce & D2C Brands", "Marketplaces", "Health Tech"],
+        "rate": (100, 260), "strategy": (0.3, 0.6),
+        "case": "First I'd model your events in {d0}, then ship a {d1} layer the team actually trusts.",
+    },
+    {
+        "title": "SEO & Content Growth",
+        "domains": ["SEO", "Technical SEO", "Content Strategy", "Link Building", "Copywriting",
+                    "Webflow", "WordPress", "Keyword Research", "Programmatic SEO", "Newsletter Growth"],
+        "icps": ["B2B SaaS", "Publishers", "E-commerce & D2C Brands", "Local Businesses"],
+        "rate": (60, 200), "strategy": (0.4, 0.7),
+        "case": "I'd fix {d0} issues blocking indexation, then build a {d1} engine around buyer-intent topics.",
+    },
+]
+FIRST_NAMES = ["Ana", "Ben", "Chloe", "Dev", "Eli", "Farah", "Gus", "Hana", "Ivan", "Jade",
+               "Kofi", "Lena", "Milo", "Nia", "Omar", "Priya", "Quinn", "Rosa", "Sam", "Tara"]
+LAST_INITIALS = "ABCDEFGHIJKLMNOPRSTVWZ"
+
+
+def generate_experts(n: int, seed: int = 42):
+    """ Yields n deterministic, realistic expert dicts (same keys as an analysis + name/rate/bio). """
+    rng = random.Random(seed)
+    for i in range(n):
+        a = rng.choice(ARCHETYPES)
+        domains = rng.sample(a["domains"], rng.randint(3, 6))
+        strategy = round(rng.uniform(*a["strategy"]), 2)
+        icp = rng.choice(a["icps"])
+        yield {
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_INITIALS)}. #{i}",
+            "headline": f"{a['title']} | {domains[0]} | {domains[1]}",
+            "rate": float(rng.randrange(a["rate"][0], a["rate"][1], 5)),
+            "domains": domains,
+            "icp_focus": icp,
+            "strength_mix": {"strategy": strategy, "execution": round(1 - strategy, 2)},
+            "confidence_score": rng.randint(55, 98),
+            "bio": a["case"].format(d0=domains[0], d1=domains[1]),
+            "vetting_summary": f"Specialist in {', '.join(domains[:3])} for {icp}.",
+        }
+
+
+def seed_synthetic(n: int, batch_size: int = 1000, seed: int = 42):
+    """ Bulk-inserts n synthetic experts through the normal ingest path (indexes included). """
+    import ingest_expert
+    batch = []
+    for row in generate_experts(n, seed):
+        batch.append((row, row["name"], row["bio"], []))
+        if len(batch) >= batch_size:
+            ingest_expert.save_experts(batch)
+            batch = []
+    if batch:
+        ingest_expert.save_experts(batch)
+    print(f"Seeding complete: {n} synthetic experts added.")
+
+
 if __name__ == "__main__":
     create_db_and_tables()
-    seed_data()
+    if len(sys.argv) > 2 and sys.argv[1] == "--synthetic":
+        seed_synthetic(int(sys.argv[2]))
+    else:
+        seed_data()
@@ -0,0 +1,129 @@
+"""
+Concurrency stress test for the SQLite setup (no network, no API key).
+
+    python stress_db.py                                   # 16 readers, 1 bulk writer, 30 s
+    python stress_db.py --readers 32 --writers 2 --seconds 60 --size 20000
+    NEXA_SQLITE_JOURNAL_MODE=DELETE python stress_db.py   # compare with the old defaults
+
+Seeds a scratch database (NEXA_DB_PATH) with a synthetic catalog, then runs
+reader threads (matching, sidebar snapshot, tag facets, need lookups) against
+writer threads doing bulk save_experts batches, and reports per-operation
+throughput, latency percentiles and errors. Any "database is locked" error
+makes the exit code non-zero.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from collections import defaultdict
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Concurrent readers vs bulk writers on SQLite")
+    parser.add_argument("--readers", type=int, default=16)
+    parser.add_argument("--writers", type=int, default=1)
+    parser.add_argument("--seconds", type=float, default=30)
+    parser.add_argument("--size", type=int, default=5000, help="synthetic experts seeded up front")
+    parser.add_argument("--batch", type=int, default=200, help="experts per writer transaction")
+    parser.add_argument("--db", default=None, help="database path (default: a fresh temp file)")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    # Configure before the app modules create their engines
+    os.environ["NEXA_DB_PATH"] = args.db or os.path.join(tempfile.mkdtemp(prefix="nexa_stress_"), "nexa.db")
+    os.environ.setdefault("NEXA_LLM", "stub")
+    os.environ.setdefault("NEXA_MATCH_CACHE", "off")
+
+    import models
+    import seed
+    import catalog
+    import expert_tags
+    import match_engine
+    import ingest_expert
+    import need_matcher
+    import telemetry
+    from benchmark import make_queries
+
+    models.create_db_and_tables()
+    print(f"Seeding {args.size} experts into {models.sqlite_file_name} "
+          f"(journal_mode={models.SQLITE_PRAGMAS['journal_mode']})...", file=sys.stderr)
+    seed.seed_synthetic(args.size)
+    queries = make_queries(200)
+
+    latencies = defaultdict(list)
+    errors = defaultdict(list)
+    lock = threading.Lock()
+    stop = threading.Event()
+
+    def timed(op, fn):
+        t0 = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            with lock:
+                errors[op].append(f"{type(e).__name__}: {e}")
+            return
+        with lock:
+            latencies[op].append((time.perf_counter() - t0) * 1000)
+
+    def reader(i):
+        rng = random.Random(i)
+        ops = [
+            ("match_local", lambda: match_engine.find_best_matches(rng.choice(queries), mode="local", use_cache=False)),
+            ("match_llm", lambda: match_engine.find_best_matches(rng.choice(queries), mode="llm", use_cache=False)),
+            ("name_page", lambda: catalog.name_page(rng.choice(["", "a", "#1"]), rng.randint(1, 20))),
+            ("expert_count", catalog.expert_count),
+            ("tag_counts", lambda: expert_tags.tag_counts(limit=20)),
+            ("need_matches", lambda: need_matcher.get_matches([1, 2, 3])),
+        ]
+        while not stop.is_set():
+            timed(*rng.choice(ops))
+
+    def writer(i):
+        n = 0
+        while not stop.is_set():
+            batch = [
+                (row, f"stress w{i} #{n + k}", row["bio"], [])
+                for k, row in enumerate(seed.generate_experts(args.batch, seed=1000 * i + n))
+            ]
+            timed("save_experts", lambda: ingest_expert.save_experts(batch))
+            n += args.batch
+
+    # Silence per-event telemetry logging; the ring buffer is not needed here
+    telemetry.sinks.clear()
+    threads = [threading.Thread(target=reader, args=(i,), daemon=True) for i in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(i,), daemon=True) for i in range(args.writers)]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join(timeout=60)
+    elapsed = time.perf_counter() - started
+
+    report = {"seconds": round(elapsed, 1), "readers": args.readers, "writers": args.writers, "ops": {}}
+    for op in sorted(set(latencies) | set(errors)):
+        values = latencies.get(op, [])
+        report["ops"][op] = {
+            "ok": len(values),
+            "per_s": round(len(values) / elapsed, 1),
+            "p50_ms": round(telemetry.percentile(values, 50), 1),
+            "p95_ms": round(telemetry.percentile(values, 95), 1),
+            "p99_ms": round(telemetry.percentile(values, 99), 1),
+            "errors": len(errors.get(op, [])),
+            "first_error": errors[op][0] if errors.get(op) else None,
+        }
+    print(json.dumps(report, indent=2))
+    locked = sum("locked" in e for errs in errors.values() for e in errs)
+    sys.exit(1 if locked else 0)
+
+
+if __name__ == "__main__":
+    main()
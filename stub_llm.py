@@ -0,0 +1,139 @@
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+
+# Deterministic offline stand-in for genai.GenerativeModel.
+# Answers the two prompts this app sends (forensic analysis and matchmaking)
+# with well-formed JSON derived from the prompt text, so ingestion and matching
+# can run without network or API key. Enable with NEXA_LLM=stub.
+
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9+#.-]{2,}")
+_COMMON = {
+    "the", "and", "for", "with", "that", "this", "have", "from", "their", "they",
+    "your", "you", "are", "was", "will", "can", "has", "our", "not", "but",
+    "years", "help", "helps", "work", "worked", "who", "what", "into", "about",
+}
+_ICPS = [
+    "B2B SaaS Startups", "E-commerce & D2C Brands", "FinTech Startups",
+    "Agencies & Service Businesses", "Local Businesses", "Enterprise IT Teams",
+]
+
+
+class StubResponse:
+    def __init__(self, text: str, prompt_tokens: int = 0):
+        self.text = text
+        self.usage_metadata = type("Usage", (), {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": max(1, len(text) // 4),
+        })()
+
+
+class StubStream:
+    """ Mimics a stream=True response: iterate for chunks, then read .text / .usage_metadata. """
+    def __init__(self, text: str, prompt_tokens: int = 0, latency: float = 0.0, chunk_chars: int = 32):
+        self._full = StubResponse(text, prompt_tokens)
+        self.text = text
+        self.usage_metadata = self._full.usage_metadata
+        self._latency = latency
+        self._chunk_chars = chunk_chars
+
+    def __iter__(self):
+        pieces = [self.text[i:i + self._chunk_chars] for i in range(0, len(self.text), self._chunk_chars)] or [""]
+        for piece in pieces:
+            if self._latency:
+                time.sleep(self._latency / len(pieces))
+            yield StubResponse(piece)
+
+
+class StubError(RuntimeError):
+    """ Injected failure (simulates 429/5xx from the real API). """
+
+
+class StubModel:
+    def __init__(self, model_name: str = "stub", latency: float = 0.0, failure_rate: float = 0.0, seed: int = 0):
+        self.model_name = model_name
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, stream: bool = False, **kwargs):
+        with self._lock:
+            fail = self._rng.random() < self.failure_rate
+        # Streams pay a short time-to-first-token up front, the rest while chunks arrive
+        upfront = self.latency * (0.1 if stream else 1.0)
+        if upfront:
+            time.sleep(upfront)
+        if fail:
+            raise StubError("429 Resource has been exhausted (stub)")
+
+        if "Forensic Data Extractor" in prompt:
+            text = json.dumps(_fake_analysis(prompt))
+        elif "Matchmaker" in prompt and re.search(r"^PROBLEM \d+:", prompt, re.M):
+            text = json.dumps(_fake_multi_matches(prompt))
+        elif "Matchmaker" in prompt:
+            text = json.dumps(_fake_matches(prompt))
+        else:
+            text = "{}"
+        if stream:
+            return StubStream(text, prompt_tokens=len(prompt) // 4, latency=self.latency - upfront)
+        return StubResponse(text, prompt_tokens=len(prompt) // 4)
+
+
+def _digest(text: str) -> int:
+    return int(hashlib.sha256(text.encode("utf-8")).hexdigest()[:8], 16)
+
+
+def _field(prompt: str, label: str) -> str:
+    match = re.search(rf"{label}:\s*(.*)", prompt)
+    return match.group(1).strip() if match else ""
+
+
+def _fake_analysis(prompt: str):
+    name = _field(prompt, "Name")
+    bio = _field(prompt, "Bio/Context")
+    seen = []
+    for word in _WORD_RE.findall(bio):
+        if word.lower() not in _COMMON and word not in seen:
+            seen.append(word)
+    domains = seen[:10] or ["Generalist"]
+    h = _digest(name + bio)
+    strategy = round((h % 11) / 10, 1)
+    return {
+        "headline": " | ".join(domains[:3]),
+        "domains": domains,
+        "icp_focus": _ICPS[h % len(_ICPS)],
+        "strength_mix": {"Strategy": strategy, "Execution": round(1 - strategy, 1)},
+        "confidence_score": 50 + h % 50,
+        "vetting_summary": f"Stub analysis of {name or 'this expert'}. Skills inferred from the submitted text.",
+    }
+
+
+def _fake_multi_matches(prompt: str):
+    """ Batched prompt (match_dispatcher): answers each PROBLEM section on its own. """
+    sections = re.split(r"^PROBLEM (\d+):", prompt, flags=re.M)
+    return {number: _fake_matches(body) for number, body in zip(sections[1::2], sections[2::2])}
+
+
+def _fake_matches(prompt: str):
+    problem = set(w.lower() for w in _WORD_RE.findall(_field(prompt, "SME PROBLEM")))
+    scored = []
+    for line in prompt.splitlines():
+        match = re.match(r"\s*- Name: (.*?) \|(.*)", line)
+        if not match:
+            continue
+        name, rest = match.group(1), match.group(2)
+        overlap = problem & set(w.lower() for w in _WORD_RE.findall(rest))
+        scored.append((len(overlap), -_digest(name) % 100, name, sorted(overlap)))
+    scored.sort(reverse=True)
+    return [
+        {
+            "expert_name": name,
+            "score": min(99, 60 + 10 * hits),
+            "reason": f"Overlap on {', '.join(words)}" if words else "Closest available profile",
+        }
+        for hits, _, name, words in scored[:3]
+    ]
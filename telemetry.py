@@ -0,0 +1,190 @@
+import json
+import math
+import time
+import logging
+import threading
+import contextvars
+from collections import deque, defaultdict
+from contextlib import contextmanager
+
+# Structured per-stage timings for matching and ingestion.
+#
+#   with telemetry.trace("find_best_matches") as t:
+#       with t.stage("db_load"): ...
+#       t.incr("match_cache_miss")
+#
+# Code deeper in the call stack reaches the active trace via telemetry.current()
+# (a no-op trace when nothing is being traced). Finished traces are emitted as
+# one event dict to every registered sink.
+
+logger = logging.getLogger("nexa.telemetry")
+
+# Process-wide counters (cache hits/misses etc.), never reset
+totals = defaultdict(int)
+_totals_lock = threading.Lock()
+
+
+# --- SINKS ---
+class JsonLogSink:
+    """ One JSON line per event on the 'nexa.telemetry' logger (INFO). """
+    def __init__(self, log=None):
+        self.log = log or logger
+
+    def emit(self, event):
+        self.log.info(json.dumps(event, default=str))
+
+
+class RingBufferSink:
+    """ Keeps the last `size` events in memory for dashboards (p50/p95). """
+    def __init__(self, size: int = 500):
+        self._events = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def emit(self, event):
+        with self._lock:
+            self._events.append(event)
+
+    def clear(self):
+        with self._lock:
+            self._events.clear()
+
+    def events(self, op: str = None):
+        with self._lock:
+            return [e for e in self._events if op is None or e["op"] == op]
+
+    def summary(self):
+        """ [{op, stage, count, p50_ms, p95_ms}] over the buffered events, 'total' included. """
+        samples = defaultdict(list)
+        for e in self.events():
+            samples[(e["op"], "total")].append(e["total_ms"])
+            for stage, ms in e["stages"].items():
+                samples[(e["op"], stage)].append(ms)
+        return [
+            {"op": op, "stage": stage, "count": len(v),
+             "p50_ms": round(percentile(v, 50), 1), "p95_ms": round(percentile(v, 95), 1)}
+            for (op, stage), v in sorted(samples.items())
+        ]
+
+
+def percentile(values, pct: float) -> float:
+    """ Nearest-rank percentile (no NumPy needed for a few hundred samples). """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+ring = RingBufferSink()
+sinks = [JsonLogSink(), ring]
+
+def add_sink(sink):
+    sinks.append(sink)
+
+def remove_sink(sink):
+    if sink in sinks:
+        sinks.remove(sink)
+
+
+# --- TRACES ---
+class Trace:
+    def __init__(self, op: str, **attrs):
+        self.op = op
+        self.attrs = dict(attrs)
+        self.stages = defaultdict(float)
+        self.counters = defaultdict(int)
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str):
+        """ Times a block; repeated stages (e.g. parallel LLM calls) are summed. """
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.stages[name] += (time.perf_counter() - t0) * 1000
+
+    def incr(self, counter: str, n: int = 1):
+        with self._lock:
+            self.counters[counter] += n
+        with _totals_lock:
+            totals[counter] += n
+
+    def add(self, **attrs):
+        """ Sets attributes; numeric *_tokens / *_chars values accumulate across calls. """
+        with self._lock:
+            for k, v in attrs.items():
+                if k.endswith(("_tokens", "_chars")) and isinstance(v, (int, float)):
+                    self.attrs[k] = self.attrs.get(k, 0) + v
+                else:
+                    self.attrs[k] = v
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+
+    def event(self):
+        return {
+            "op": self.op,
+            "ts": time.time(),
+            "total_ms": round(self.elapsed_ms(), 2),
+            "stages": {k: round(v, 2) for k, v in self.stages.items()},
+            "counters": dict(self.counters),
+            **self.attrs,
+        }
+
+
+class _NullTrace(Trace):
+    """ Used when no trace is active: counters still reach the process totals. """
+    def __init__(self):
+        super().__init__("none")
+
+    @contextmanager
+    def stage(self, name: str):
+        yield
+
+    def add(self, **attrs):
+        pass
+
+
+_current = contextvars.ContextVar("nexa_trace", default=None)
+
+def current() -> Trace:
+    return _current.get() or _NullTrace()
+
+
+@contextmanager
+def trace(op: str, **attrs):
+    """ Starts a trace (nested calls join the outer one) and emits it on exit. """
+    outer = _current.get()
+    if outer is not None:
+        yield outer
+        return
+    t = Trace(op, **attrs)
+    token = _current.set(t)
+    try:
+        yield t
+    except Exception as e:
+        t.add(error=f"{type(e).__name__}: {e}")
+        raise
+    finally:
+        _current.reset(token)
+        event = t.event()
+        for sink in list(sinks):
+            try:
+                sink.emit(event)
+            except Exception:
+                logger.exception("Telemetry sink failed")
+
+
+def record_llm_usage(prompt: str, response):
+    """ Adds prompt/response token counts (SDK usage metadata, or a chars/4 estimate). """
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None) or len(prompt) // 4
+    try:
+        text = response.text
+    except Exception:
+        text = ""
+    response_tokens = getattr(usage, "candidates_token_count", None) or len(text) // 4
+    current().add(prompt_tokens=prompt_tokens, response_tokens=response_tokens, prompt_chars=len(prompt))
@@ -0,0 +1,21 @@
+import os
+import sys
+import tempfile
+import pytest
+
+# App modules read their settings at import time: point them at a scratch
+# database and the offline stub model before any test imports them.
+os.environ["NEXA_DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="nexa_test_"), "nexa.db")
+os.environ["NEXA_LLM"] = "stub"
+os.environ["NEXA_MATCH_CACHE"] = "off"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope="session")
+def synthetic_catalog():
+    """ A 500-expert synthetic catalog, seeded once per test session. """
+    import models
+    import seed
+    models.create_db_and_tables()
+    seed.seed_synthetic(500)
+    return 500
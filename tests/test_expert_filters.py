@@ -0,0 +1,29 @@
+import pytest
+from expert_filters import parse_budget_band
+
+
+@pytest.mark.parametrize("band, expected", [
+    # docstring examples
+    ("$80-150/hr", {"min_rate": 80, "max_rate": 150}),
+    ("under $200", {"max_rate": 200}),
+    ("$300+", {"min_rate": 300}),
+    ("1.5k", {"max_rate": 1500}),
+    ("$1,500-2,000", {"min_rate": 1500, "max_rate": 2000}),
+    ("$1,500-2,000/month", {}),
+    # ranges with a k suffix
+    ("5-10k", {"min_rate": 5000, "max_rate": 10000}),
+    ("$5k-10k", {"min_rate": 5000, "max_rate": 10000}),
+    ("$500-1.5k", {"min_rate": 500, "max_rate": 1500}),
+    ("1.5-2k", {"min_rate": 1500, "max_rate": 2000}),
+    ("over 2k", {"min_rate": 2000}),
+    # separators and periods
+    ("$12,000,000", {"max_rate": 12000000}),
+    ("$150 an hour", {"max_rate": 150}),
+    ("$3k per project", {}),
+    ("$5k/mo", {}),
+    ("", {}),
+    (None, {}),
+    ("flexible", {}),
+])
+def test_parse_budget_band(band, expected):
+    assert parse_budget_band(band) == expected
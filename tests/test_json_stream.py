@@ -0,0 +1,49 @@
+import json
+
+import pytest
+
+import json_stream
+import match_engine
+
+ANSWER = '[ {"expert_name": "Ada", "score": 90, "reason": "KYC"}, {"expert_name": "Mark", "score": 70, "reason": "[x]"} ]'
+
+
+def _feed(chunks):
+    parser = json_stream.ArrayItemParser()
+    return [item for chunk in chunks for item in parser.feed(chunk)], parser
+
+
+@pytest.mark.parametrize("text", [
+    ANSWER,
+    "```json\n" + ANSWER + "\n```",
+    "Here are [3] picks:\n" + ANSWER,
+    "Top [[2]] of [ 5 ]:\n" + ANSWER,
+])
+def test_items_after_preamble(text):
+    items, parser = _feed([text[i:i + 7] for i in range(0, len(text), 7)])
+    assert [i["expert_name"] for i in items] == ["Ada", "Mark"]
+    assert parser.done
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class _Model:
+    def __init__(self, text):
+        self.text = text
+
+    def generate_content(self, prompt, stream=False):
+        return [_Chunk(self.text[i:i + 5]) for i in range(0, len(self.text), 5)]
+
+
+def test_stream_skips_preamble():
+    model = _Model("Here are [2] picks:\n" + ANSWER)
+    picks = list(match_engine.stream_rank_with_llm(model, "kyc", [], top_n=2))
+    assert [p["expert_name"] for p in picks] == ["Ada", "Mark"]
+
+
+def test_stream_without_matches_raises():
+    with pytest.raises(json.JSONDecodeError):
+        list(match_engine.stream_rank_with_llm(_Model("No good [fit] here: []"), "kyc", [], top_n=2))
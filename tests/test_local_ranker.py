@@ -0,0 +1,19 @@
+import local_ranker
+
+ROWS = [
+    (1, "Ada", "Fintech compliance | KYC", ["Fintech", "Compliance"], "Banks", "Regulatory work.", {"strategy": 0.6, "execution": 0.4}, 90),
+    (2, "Elena", "B2B SaaS growth", ["GTM Strategy"], "SaaS", "Strategic thinker.", {"strategy": 0.9, "execution": 0.1}, 95),
+    (3, "Mark", "Shopify apps", ["Shopify"], "DTC", "Builds stores.", {"strategy": 0.2, "execution": 0.8}, 85),
+]
+
+
+def test_irrelevant_experts_are_not_padded_in():
+    results = local_ranker.LocalRanker(ROWS).rank("fintech compliance")
+    assert [r["expert_name"] for r in results] == ["Ada"]
+    assert all(r["score"] > 0 for r in results)
+
+
+def test_strongest_profiles_when_nothing_matches():
+    results = local_ranker.LocalRanker(ROWS).rank("quantum chemistry")
+    assert [r["expert_name"] for r in results] == ["Elena", "Ada", "Mark"]
+    assert all("Strongest available profile" in r["reason"] for r in results)
@@ -0,0 +1,68 @@
+import threading
+import pytest
+import llm_client
+import match_dispatcher
+import match_engine
+import stub_llm
+
+QUERIES = [
+    "help with facebook ads for my shopify store",
+    "email marketing klaviyo flows for DTC",
+    "b2b saas pricing and gtm strategy",
+    "seo audit for local business",
+    "crm hubspot migration",
+]
+
+
+@pytest.fixture
+def llm_calls(monkeypatch):
+    """ Prompts sent to the stub model (which answers after a short delay). """
+    calls = []
+    generate = stub_llm.StubModel.generate_content
+
+    def counting(self, prompt, stream=False):
+        calls.append(prompt)
+        return generate(self, prompt, stream=stream)
+
+    monkeypatch.setattr(stub_llm.StubModel, "generate_content", counting)
+    llm_client.use_stub(latency=0.2)
+    yield calls
+    llm_client.use_stub(latency=0)
+
+
+def test_default_shortlist_fits_one_prompt(synthetic_catalog):
+    for query in QUERIES:
+        assert not match_engine.needs_tournament(match_engine.load_candidates(query, None, None))
+
+
+def test_concurrent_queries_are_batched(synthetic_catalog, llm_calls):
+    dispatcher = match_dispatcher.MatchDispatcher()
+    start = threading.Barrier(3 * len(QUERIES))
+    results = []
+
+    def run(query):
+        start.wait()
+        results.append(dispatcher.find_best_matches(query, mode="llm"))
+
+    threads = [threading.Thread(target=run, args=(q,)) for q in QUERIES * 3]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 3 * len(QUERIES)
+    assert all(len(r) == 3 and "[AI MATCH]" in r[0]["reason"] for r in results)
+    # Identical queries coalesce and distinct ones share multi-query prompts
+    assert len(llm_calls) < len(QUERIES)
+    assert any("PROBLEM 2:" in prompt for prompt in llm_calls)
+
+
+def test_rate_limits_keep_the_resolved_model(synthetic_catalog):
+    llm_client.use_stub(failure_rate=1)
+    try:
+        model = llm_client.get_model()
+        results, cacheable = match_engine.match_with_status(QUERIES[0], mode="hybrid", use_cache=False)
+        assert results and not cacheable
+        assert llm_client.get_model() is model
+    finally:
+        llm_client.use_stub(failure_rate=0)
@@ -0,0 +1,44 @@
+import time
+from sqlmodel import Session
+import ingest_expert
+import llm_client
+import models
+import need_matcher
+
+ACE = {
+    "headline": "Facebook Ads | Shopify CRO", "domains": ["Facebook Ads", "Shopify"], "icp_focus": "DTC e-commerce",
+    "strength_mix": {"strategy": 0.3, "execution": 0.7}, "confidence_score": 95,
+    "vetting_summary": "Facebook ads for shopify stores.",
+}
+
+
+def _stale(need_id):
+    with Session(models.engine) as session:
+        return session.get(models.SMENeed, need_id).stale
+
+
+def test_new_expert_reaches_llm_lists_off_the_save_path(synthetic_catalog):
+    with Session(models.engine) as session:
+        need = models.SMENeed(core_pain="facebook ads not converting for our shopify store",
+                              budget_band="$3k/month", desired_outcome="lower CAC")
+        session.add(need)
+        session.commit()
+        need_id = need.id
+    need_matcher.match_open_needs(mode="llm")
+    assert {m["source"] for m in need_matcher.get_matches([need_id])[need_id]} == {"llm"}
+
+    llm_client.use_stub(latency=1.0)
+    try:
+        started = time.perf_counter()
+        ingest_expert.save_experts([(ACE, "Test Ace", "bio", [])])
+        # The save only marks the need; it does not wait on the model
+        assert time.perf_counter() - started < 1.0
+    finally:
+        llm_client.use_stub(latency=0)
+    assert _stale(need_id)
+
+    assert need_matcher.rematch_stale()["matched"] >= 1
+    assert not _stale(need_id)
+    matches = need_matcher.get_matches([need_id])[need_id]
+    assert "Test Ace" in [m["expert_name"] for m in matches]
+    assert {m["source"] for m in matches} == {"llm"}
@@ -0,0 +1,279 @@
+import os
+import config
+import json
+import re
+import zlib
+import threading
+import numpy as np
+from sqlmodel import Session, select
+from models import Expert, engine, sqlite_file_name
+from search_index import STOPWORDS
+import catalog
+
+# Vector files live next to the database (nexa.db -> nexa_vectors.f32 / .ids / .json)
+_BASE = os.path.splitext(sqlite_file_name)[0] + "_vectors"
+VECTORS_PATH = _BASE + ".f32"
+IDS_PATH = _BASE + ".ids"
+META_PATH = _BASE + ".json"
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+# --- EMBEDDERS ---
+class HashingEmbedder:
+    """
+    Offline default: signed feature hashing of words, word bigrams and
+    character 4-grams. Character n-grams let 'leaks' meet 'leaky' and
+    'analytics' meet 'analysis' without any network call.
+    """
+    def __init__(self, dim: int = 512):
+        self.dim = dim
+        self.name = f"hashing-v1-{dim}"
+
+    def _features(self, text: str):
+        words = [w for w in _WORD_RE.findall((text or "").lower()) if w not in STOPWORDS]
+        for w in words:
+            yield "w:" + w, 1.0
+            padded = f"<{w}>"
+            for i in range(len(padded) - 3):
+                yield "c:" + padded[i:i + 4], 0.5
+        for a, b in zip(words, words[1:]):
+            yield f"b:{a}_{b}", 0.7
+
+    def embed(self, texts):
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feat, weight in self._features(text):
+                h = zlib.crc32(feat.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                out[row, h % self.dim] += sign * weight
+        return _normalize(out)
+
+
+class GeminiEmbedder:
+    """ Uses the Gemini embedding endpoint. Requires GOOGLE_API_KEY. """
+    def __init__(self, model: str = "models/text-embedding-004"):
+        self.model = model
+        self.name = f"gemini:{model}"
+        self.dim = None
+
+    def embed(self, texts):
+        import llm_client
+        llm_client.configure()
+        genai = llm_client.genai()
+        vecs = [genai.embed_content(model=self.model, content=t)["embedding"] for t in texts]
+        out = np.asarray(vecs, dtype=np.float32)
+        self.dim = out.shape[1]
+        return _normalize(out)
+
+
+def _normalize(mat):
+    norms = np.linalg.norm(mat, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return mat / norms
+
+
+_embedder = None
+
+def get_embedder():
+    """ Process-wide embedder, chosen by NEXA_EMBEDDER ('hashing' or 'gemini'). """
+    global _embedder
+    if _embedder is None:
+        if config.get("NEXA_EMBEDDER", "hashing") == "gemini":
+            _embedder = GeminiEmbedder()
+        else:
+            _embedder = HashingEmbedder()
+    return _embedder
+
+def set_embedder(embedder):
+    """ Swaps the embedder (any object with .name and .embed(texts)). """
+    global _embedder
+    _embedder = embedder
+
+
+def expert_text(expert) -> str:
+    domains = " ".join(expert.domains or [])
+    return " ".join([
+        expert.headline or "", domains, expert.icp_focus or "",
+        expert.vetting_summary or "", expert.mini_case_response or "",
+    ])
+
+
+# --- STORE ---
+class VectorStore:
+    """
+    Append-only float32 matrix on disk, read through np.memmap.
+    Row i belongs to the expert id at position i of the .ids file.
+    Re-embedding an existing expert overwrites its row in place.
+    """
+    def __init__(self, vectors_path=VECTORS_PATH, ids_path=IDS_PATH, meta_path=META_PATH):
+        self.vectors_path = vectors_path
+        self.ids_path = ids_path
+        self.meta_path = meta_path
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._ids = None
+        self._row_of = {}
+        self._stamp = None
+
+    # -- loading --
+    def _meta(self):
+        if not os.path.exists(self.meta_path):
+            return None
+        with open(self.meta_path) as f:
+            return json.load(f)
+
+    def _file_stamp(self):
+        try:
+            st = os.stat(self.vectors_path)
+            return (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            return None
+
+    def _load(self):
+        """ (Re)maps the files if another writer changed them. Caller holds the lock. """
+        stamp = self._file_stamp()
+        if stamp == self._stamp and self._ids is not None:
+            return
+        meta = self._meta()
+        if stamp is None or meta is None:
+            self._matrix, self._ids, self._row_of = None, np.zeros(0, dtype=np.int64), {}
+        else:
+            ids = np.fromfile(self.ids_path, dtype=np.int64)
+            count = min(len(ids), stamp[0] // (4 * meta["dim"]))
+            self._ids = ids[:count]
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(count, meta["dim"])) if count else None
+            self._row_of = {int(i): r for r, i in enumerate(self._ids)}
+        self._stamp = stamp
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._ids)
+
+    def ids(self) -> set:
+        with self._lock:
+            self._load()
+            return set(self._row_of)
+
+    # -- writing --
+    def clear(self):
+        with self._lock:
+            for path in (self.vectors_path, self.ids_path, self.meta_path):
+                if os.path.exists(path):
+                    os.remove(path)
+            self._matrix, self._ids, self._row_of, self._stamp = None, None, {}, None
+
+    def upsert(self, expert_ids, vectors, embedder_name: str):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            meta = self._meta()
+            if meta and (meta["embedder"] != embedder_name or meta["dim"] != vectors.shape[1]):
+                raise ValueError(f"Vector store was built with {meta['embedder']}; rebuild it first.")
+            if not meta:
+                with open(self.meta_path, "w") as f:
+                    json.dump({"embedder": embedder_name, "dim": int(vectors.shape[1])}, f)
+            self._load()
+
+            new_rows, new_ids = [], []
+            rows, updates = [], []
+            for expert_id, vec in zip(expert_ids, vectors):
+                row = self._row_of.get(int(expert_id))
+                if row is None:
+                    new_rows.append(vec)
+                    new_ids.append(int(expert_id))
+                else:
+                    rows.append(row)
+                    updates.append(vec)
+
+            if rows:
+                # In-place overwrite of existing rows: one read-write map and one flush per call
+                rw = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=self._matrix.shape)
+                rw[rows] = updates
+                rw.flush()
+                del rw
+
+            if new_rows:
+                with open(self.vectors_path, "ab") as f:
+                    np.asarray(new_rows, dtype=np.float32).tofile(f)
+                with open(self.ids_path, "ab") as f:
+                    np.asarray(new_ids, dtype=np.int64).tofile(f)
+            self._stamp = None  # force a remap on next read
+
+    # -- reading --
+    def search(self, query_vec, top_k: int = 50, allowed=None):
+        """
+        Top-k cosine similarity (vectors are unit-length). Returns [(expert_id, score)].
+        allowed: optional sorted id array (pre-filter); other rows are skipped.
+        """
+        with self._lock:
+            self._load()
+            matrix, ids = self._matrix, self._ids
+        if matrix is None or not len(ids):
+            return []
+        sims = matrix @ np.asarray(query_vec, dtype=np.float32)
+        if allowed is not None:
+            sims[~np.isin(ids, allowed)] = -np.inf
+        k = min(top_k, len(sims))
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(int(ids[i]), float(sims[i])) for i in top if sims[i] > -np.inf]
+
+
+store = VectorStore()
+
+
+# --- CATALOG HOOKS ---
+def add_experts(experts):
+    """ Embeds and stores a batch of experts (called at ingest time). """
+    experts = [e for e in experts if e.id is not None]
+    if not experts:
+        return
+    embedder = get_embedder()
+    vectors = embedder.embed([expert_text(e) for e in experts])
+    store.upsert([e.id for e in experts], vectors, embedder.name)
+
+def add_expert(expert):
+    add_experts([expert])
+
+def rebuild(batch_size: int = 1000):
+    store.clear()
+    with Session(engine) as session:
+        last_id = 0
+        while True:
+            batch = session.exec(
+                select(Expert).where(Expert.id > last_id).order_by(Expert.id).limit(batch_size)
+            ).all()
+            if not batch:
+                break
+            add_experts(batch)
+            last_id = batch[-1].id
+
+_checked_version = None
+
+def ensure_index():
+    """
+    Keeps the store in step with the Expert table, once per catalog version.
+    A changed embedder or stored ids that are no longer experts (reset) mean a
+    full rebuild; experts that are merely missing (saved but not yet embedded)
+    are embedded on their own. Ids are compared, not counts, so a store that is
+    ahead of an older snapshot is left alone.
+    """
+    global _checked_version
+    snapshot = catalog.get_snapshot()
+    if snapshot.version == _checked_version:
+        return
+    meta = store._meta()
+    expert_ids, stored = catalog.expert_ids(), store.ids()
+    if (meta and meta["embedder"] != get_embedder().name) or stored - expert_ids:
+        rebuild()
+    elif expert_ids - stored:
+        missing = sorted(expert_ids - stored)
+        with Session(engine) as session:
+            for i in range(0, len(missing), 1000):
+                add_experts(session.exec(select(Expert).where(Expert.id.in_(missing[i:i + 1000]))).all())
+    _checked_version = snapshot.version
+
+def search(query: str, top_k: int = 50, allowed=None):
+    vec = get_embedder().embed([query])[0]
+    return store.search(vec, top_k, allowed)
@@ -0,0 +1,176 @@
+"""
+Non-blocking expert vetting.
+
+The UI only inserts a VettingJob row (enqueue) and polls its status; a pool of
+background worker threads claims queued jobs, runs the Gemini analysis under a
+shared rate limit and saves the expert. Jobs live in nexa.db, so they survive
+restarts, and several processes can drain the same table.
+
+Run a dedicated worker process with:  python vetting_queue.py
+"""
+import json
+import time
+import logging
+import threading
+from sqlmodel import Session, select
+from sqlalchemy import text
+import config
+from models import VettingJob, engine, create_db_and_tables
+from bulk_ingest import TokenBucket, call_with_retries
+import ingest_expert
+
+logger = logging.getLogger(__name__)
+
+WORKER_CONCURRENCY = int(config.get("NEXA_VETTING_WORKERS", "2"))
+# LLM calls per second across all workers in this process
+WORKER_RATE = float(config.get("NEXA_VETTING_RATE", "2"))
+MAX_ATTEMPTS = int(config.get("NEXA_VETTING_MAX_ATTEMPTS", "3"))
+# A job 'running' for longer than this is assumed orphaned by a dead worker
+STALE_AFTER_SECONDS = float(config.get("NEXA_VETTING_STALE_AFTER", "600"))
+POLL_SECONDS = 1.0
+
+_wakeup = threading.Event()
+_workers = []
+_workers_lock = threading.Lock()
+_limiter = None
+
+
+# --- PRODUCER SIDE ---
+def enqueue(name: str, bio: str, links) -> int:
+    """ Queues one expert for vetting and returns the job id. """
+    if isinstance(links, str):
+        links = [l.strip() for l in links.split(",") if l.strip()]
+    now = time.time()
+    with Session(engine) as session:
+        job = VettingJob(name=name, bio=bio, links=links, created_at=now, updated_at=now)
+        session.add(job)
+        session.commit()
+        job_id = job.id
+    _wakeup.set()
+    return job_id
+
+
+def get_jobs(job_ids):
+    """ Current state of the given jobs, in the order asked for. """
+    if not job_ids:
+        return []
+    with Session(engine) as session:
+        jobs = {j.id: j for j in session.exec(select(VettingJob).where(VettingJob.id.in_(job_ids))).all()}
+    return [jobs[i] for i in job_ids if i in jobs]
+
+
+def queue_depth() -> dict:
+    """ Job counts per status. """
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT status, COUNT(*) FROM vettingjob GROUP BY status")).all()
+    return {status: count for status, count in rows}
+
+
+# --- CONSUMER SIDE ---
+def claim_next():
+    """
+    Atomically moves the oldest queued job to 'running' and returns it
+    (as a dict), or None when the queue is empty.
+    """
+    with engine.begin() as conn:
+        row = conn.execute(
+            text(
+                "UPDATE vettingjob SET status = 'running', attempts = attempts + 1, updated_at = :now "
+                "WHERE id = (SELECT id FROM vettingjob WHERE status = 'queued' ORDER BY id LIMIT 1) "
+                "AND status = 'queued' "
+                "RETURNING id, name, bio, links, attempts"
+            ),
+            {"now": time.time()},
+        ).mappings().first()
+    if row is None:
+        return None
+    job = dict(row)
+    if isinstance(job["links"], str):
+        # Raw SQL returns the JSON column as text
+        job["links"] = json.loads(job["links"] or "[]")
+    return job
+
+
+def _finish(job_id: int, **fields):
+    with Session(engine) as session:
+        job = session.get(VettingJob, job_id)
+        for k, v in fields.items():
+            setattr(job, k, v)
+        job.updated_at = time.time()
+        session.add(job)
+        session.commit()
+
+
+def process(job: dict):
+    """ Analyzes and saves one claimed job, recording the outcome on the row. """
+    try:
+        analysis = call_with_retries(
+            lambda: ingest_expert.request_analysis(job["name"], job["bio"], ", ".join(job["links"])),
+            retries=1, limiter=_limiter,
+        )
+        expert = ingest_expert.save_expert(analysis, job["name"], job["bio"], job["links"])
+        _finish(job["id"], status="done", expert_id=expert.id, error=None)
+    except Exception as e:
+        logger.warning("Vetting job %s failed (attempt %s): %s", job["id"], job["attempts"], e)
+        status = "queued" if job["attempts"] < MAX_ATTEMPTS else "failed"
+        _finish(job["id"], status=status, error=str(e))
+
+
+def recover_stale():
+    """ Requeues jobs whose worker died mid-flight. Returns how many were requeued. """
+    with engine.begin() as conn:
+        result = conn.execute(
+            text("UPDATE vettingjob SET status = 'queued', updated_at = :now "
+                 "WHERE status = 'running' AND updated_at < :cutoff"),
+            {"now": time.time(), "cutoff": time.time() - STALE_AFTER_SECONDS},
+        )
+    return result.rowcount
+
+
+def _worker_loop(stop: threading.Event):
+    while not stop.is_set():
+        try:
+            job = claim_next()
+        except Exception:
+            logger.exception("Could not claim a vetting job")
+            job = None
+        if job is None:
+            _wakeup.wait(POLL_SECONDS)
+            _wakeup.clear()
+            continue
+        process(job)
+
+
+def start_workers(concurrency: int = None):
+    """
+    Starts the background worker pool once per process (idempotent, so it is
+    safe to call on every Streamlit rerun). Returns the stop event.
+    """
+    global _limiter
+    with _workers_lock:
+        if _workers:
+            return _workers[0][1]
+        create_db_and_tables()
+        recover_stale()
+        _limiter = TokenBucket(WORKER_RATE)
+        stop = threading.Event()
+        for i in range(concurrency or WORKER_CONCURRENCY):
+            thread = threading.Thread(target=_worker_loop, args=(stop,), name=f"vetting-worker-{i}", daemon=True)
+            thread.start()
+            _workers.append((thread, stop))
+        return stop
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    start_workers()
+    # Saves made here mark needs stale; re-match them in this process too
+    import need_matcher
+    need_matcher.start_worker()
+    print(f"Vetting workers running ({WORKER_CONCURRENCY} threads). Ctrl+C to stop.")
+    try:
+        while True:
+            time.sleep(60)
+            recover_stale()
+    except KeyboardInterrupt:
+        pass